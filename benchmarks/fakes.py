@@ -0,0 +1,328 @@
+"""Deterministic local stand-ins for Azure OpenAI, Blob Storage and Google Drive.
+
+Each fake sleeps for a configurable latency and returns payloads of a
+configurable size, so the pipeline can be timed offline and compared between
+commits. ``install_fakes`` wires them into the ``llm`` modules.
+"""
+from types import SimpleNamespace
+import asyncio
+import base64
+import json
+import os
+import threading
+import time
+
+ACCOUNT = ("benchaccount", base64.b64encode(b"bench-account-key").decode())
+DRIVE_FOLDER_ID = "bench-root"
+
+
+class Latency:
+    """Seconds each fake waits before answering."""
+
+    def __init__(self, llm=0.0, llm_chunk=0.0, blob=0.0, drive=0.0):
+        self.llm = llm
+        self.llm_chunk = llm_chunk
+        self.blob = blob
+        self.drive = drive
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def _sleep(seconds):
+    if seconds > 0:
+        time.sleep(seconds)
+
+
+def _tokens(text):
+    # Rough enough for the usage counters
+    return max(1, len(text) // 4)
+
+
+# -----------------------------
+# Synthetic payloads
+# -----------------------------
+def synthetic_cost_json(components, pipelines=None):
+    """A cost JSON in the shape the model returns, with ``components`` cost rows."""
+    pipelines = pipelines or max(1, components // 10)
+    return {
+        "baseline_summary": [
+            {
+                "parameter": f"Parameter {i}",
+                "usecase_details": f"Synthetic detail {i}",
+                "source_of_assumption": "Assumed",
+                "notes": "Benchmark fixture",
+            }
+            for i in range(10)
+        ],
+        "detailed_cost_components": [
+            {
+                "component": f"Component {i}",
+                "calculation_logic": f"{i % 7 + 1} units x rate",
+                "quantity": float(i % 7 + 1),
+                "unit": "GB-month",
+                "unit_cost_usd": round(0.01 * (i % 97 + 1), 4),
+                "source": "Azure pricing",
+                "remarks": "Synthetic",
+            }
+            for i in range(components)
+        ],
+        "pipeline_groups": [
+            {
+                "pipeline_name": f"Pipeline {i}",
+                "data_sources_included": f"Source {i}",
+                "refresh_frequency": "Daily",
+                "runs_per_month": 30,
+                "avg_hours_per_run": round(0.25 * (i % 8 + 1), 2),
+            }
+            for i in range(pipelines)
+        ],
+        "cost_inputs": {
+            "dbus_per_hour": 4,
+            "dbu_rate_usd": 0.55,
+            "environment_factors": {"Dev": 0.3, "QA": 0.2, "Prod": 1.0},
+            "monthly_growth_rate": 0.02,
+        },
+    }
+
+
+def make_image(path, side):
+    """Write a synthetic architecture diagram PNG, ``side`` pixels wide."""
+    from PIL import Image, ImageDraw
+
+    image = Image.new("RGB", (side, side * 3 // 4), "white")
+    draw = ImageDraw.Draw(image)
+    # Deterministic boxes and arrows so the image compresses like a real diagram
+    for i in range(12):
+        x, y = (i % 4) * side // 4 + 10, (i // 4) * side // 4 + 10
+        draw.rectangle([x, y, x + side // 6, y + side // 10], outline="black", width=3)
+        draw.line([x + side // 6, y + side // 20, x + side // 4, y + side // 20], fill="blue", width=2)
+    image.save(path)
+    return path
+
+
+def synthetic_text(chars, label):
+    line = f"{label}: ADLS Gen2 -> Databricks Jobs -> Delta Lake -> Power BI.\n"
+    return (line * (chars // len(line) + 1))[:chars]
+
+
+# -----------------------------
+# Azure OpenAI
+# -----------------------------
+class FakeAzureOpenAI:
+    """Answers the Responses and Chat Completions calls made by ``llm.llm``."""
+
+    def __init__(self, cost_json, latency=None, description_chars=2000, chunk_chars=256):
+        self.cost_json = cost_json
+        self.cost_text = json.dumps(cost_json)
+        self.latency = latency or Latency()
+        self.description = synthetic_text(description_chars, "Diagram")
+        self.solution = synthetic_text(description_chars, "Solution")
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.responses = SimpleNamespace(create=self._respond)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    def _count(self):
+        with self._lock:
+            self.calls += 1
+
+    def _respond(self, **kwargs):
+        self._count()
+        _sleep(self.latency.llm)
+        return self._response(**kwargs)
+
+    def _complete(self, stream=False, **kwargs):
+        self._count()
+        _sleep(self.latency.llm)
+        if stream:
+            return self._stream(kwargs["messages"][-1]["content"])
+        return self._completion(**kwargs)
+
+    def _response(self, input, text=None, **kwargs):
+        prompt = input[0]["content"][0]["text"]
+        # A structured output format means the fused cost JSON call
+        output = self.cost_text if text else self.description
+        usage = SimpleNamespace(input_tokens=_tokens(prompt) + 765, output_tokens=_tokens(output))
+        return SimpleNamespace(output_text=output, usage=usage)
+
+    def _completion(self, messages, response_format=None, **kwargs):
+        prompt = messages[-1]["content"]
+
+        if response_format:
+            # A single section requested again during repair
+            name = response_format["json_schema"]["name"].replace("cost_estimate_", "", 1)
+            output = json.dumps({name: self.cost_json[name]})
+        else:
+            output = self.solution
+
+        usage = SimpleNamespace(prompt_tokens=_tokens(prompt), completion_tokens=_tokens(output))
+        message = SimpleNamespace(content=output)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+    def _chunks(self, prompt):
+        text = self.cost_text
+        for start in range(0, len(text), self.chunk_chars):
+            delta = SimpleNamespace(content=text[start:start + self.chunk_chars])
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)], usage=None)
+
+        usage = SimpleNamespace(prompt_tokens=_tokens(prompt), completion_tokens=_tokens(text))
+        yield SimpleNamespace(choices=[], usage=usage)
+
+    def _stream(self, prompt):
+        for chunk in self._chunks(prompt):
+            if chunk.choices:
+                _sleep(self.latency.llm_chunk)
+            yield chunk
+
+
+class FakeAsyncAzureOpenAI:
+    """``AsyncAzureOpenAI`` counterpart of ``FakeAzureOpenAI``; waits with asyncio.sleep."""
+
+    def __init__(self, fake):
+        self.fake = fake
+        self.responses = SimpleNamespace(create=self._respond)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    async def _respond(self, **kwargs):
+        self.fake._count()
+        await asyncio.sleep(self.fake.latency.llm)
+        return self.fake._response(**kwargs)
+
+    async def _complete(self, stream=False, **kwargs):
+        self.fake._count()
+        await asyncio.sleep(self.fake.latency.llm)
+        if stream:
+            return self._stream(kwargs["messages"][-1]["content"])
+        return self.fake._completion(**kwargs)
+
+    async def _stream(self, prompt):
+        for chunk in self.fake._chunks(prompt):
+            if chunk.choices:
+                await asyncio.sleep(self.fake.latency.llm_chunk)
+            yield chunk
+
+
+# -----------------------------
+# Azure Blob Storage
+# -----------------------------
+class FakeContainerClient:
+    def __init__(self, service):
+        self.service = service
+
+    def create_container(self):
+        _sleep(self.service.latency)
+
+    def upload_blob(self, name, data, overwrite=False):
+        _sleep(self.service.latency)
+        with self.service._lock:
+            self.service.blobs[name] = len(data)
+
+
+class FakeBlobServiceClient:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.blobs = {}
+        self._lock = threading.Lock()
+
+    def get_container_client(self, container_name):
+        return FakeContainerClient(self)
+
+
+class FakeAsyncContainerClient(FakeContainerClient):
+    async def create_container(self):
+        await asyncio.sleep(self.service.latency)
+
+    async def upload_blob(self, name, data, overwrite=False):
+        await asyncio.sleep(self.service.latency)
+        self.service.blobs[name] = len(data)
+
+
+class FakeAsyncBlobServiceClient(FakeBlobServiceClient):
+    def get_container_client(self, container_name):
+        return FakeAsyncContainerClient(self)
+
+
+# -----------------------------
+# Google Drive (files().list/get/create(...).execute())
+# -----------------------------
+class _Request:
+    def __init__(self, latency, result):
+        self.latency = latency
+        self.result = result
+
+    def execute(self):
+        _sleep(self.latency)
+        return self.result
+
+
+class _Files:
+    def __init__(self, service):
+        self.service = service
+
+    def list(self, **kwargs):
+        return _Request(self.service.latency, {"files": []})
+
+    def get(self, fileId, **kwargs):
+        return _Request(self.service.latency, {"id": fileId, "name": "Benchmark root", "driveId": "bench"})
+
+    def create(self, body, media_body=None, **kwargs):
+        with self.service._lock:
+            self.service.created += 1
+            file_id = f"bench-{self.service.created}"
+        return _Request(self.service.latency, {
+            "id": file_id,
+            "webViewLink": f"https://drive.example/{file_id}/view",
+            "webContentLink": f"https://drive.example/{file_id}/download",
+        })
+
+
+class FakeDriveService:
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.created = 0
+        self._lock = threading.Lock()
+
+    def files(self):
+        return _Files(self)
+
+
+# -----------------------------
+# Wiring
+# -----------------------------
+def configure_environment(workdir):
+    """Point every store at ``workdir``. Must run before ``llm`` is imported."""
+    os.environ.setdefault("OPEN_AI_MODEL", "bench-model")
+    os.environ["LLM_CACHE_PATH"] = os.path.join(workdir, "llm_cache.db")
+    os.environ["ESTIMATE_STORE_PATH"] = os.path.join(workdir, "estimates.db")
+    os.environ["JOB_STORE_PATH"] = os.path.join(workdir, "jobs.db")
+    os.environ["DRIVE_FOLDER_ID"] = DRIVE_FOLDER_ID
+    # Latency is simulated here; retries and hedging would only add noise
+    os.environ["LLM_HEDGE_AFTER_SECONDS"] = "0"
+
+
+def install_fakes(cost_json, latency=None, description_chars=2000, chunk_chars=256):
+    """Replace the OpenAI, Blob and Drive clients used by ``llm`` with fakes."""
+    import llm.adls
+    import llm.gdrive
+    import llm.llm
+
+    latency = latency or Latency()
+    openai = FakeAzureOpenAI(cost_json, latency, description_chars, chunk_chars)
+    fakes = SimpleNamespace(
+        openai=openai,
+        async_openai=FakeAsyncAzureOpenAI(openai),
+        blob=FakeBlobServiceClient(latency.blob),
+        async_blob=FakeAsyncBlobServiceClient(latency.blob),
+        drive=FakeDriveService(latency.drive),
+    )
+
+    llm.llm.get_async_client = lambda: fakes.async_openai
+    llm.adls._blob_service, llm.adls._account = fakes.blob, ACCOUNT
+    llm.adls.get_async_blob_service = lambda: (fakes.async_blob, ACCOUNT)
+    llm.gdrive.get_drive_service = lambda: fakes.drive
+    # Folder lookups are memoized per process; start every benchmark cold
+    llm.gdrive._folder_ids.clear()
+    llm.gdrive._validated_roots.clear()
+    return fakes
@@ -0,0 +1,73 @@
+"""Import-time guard for the API server.
+
+Imports ``server`` in fresh interpreters, reports the median time as JSON and
+exits non-zero when it exceeds the budget or a heavy SDK is imported eagerly.
+
+    python benchmarks/import_time.py --runs 5 --budget 1.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must only be imported on first use or by the startup warm-up
+LAZY_MODULES = [
+    "openai",
+    "openpyxl",
+    "numpy",
+    "PIL",
+    "httpx",
+    "googleapiclient",
+    "azure.storage.blob",
+]
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import server
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def measure(runs):
+    samples = []
+    loaded = set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        samples.append(result["seconds"])
+        loaded.update(result["loaded"])
+    return samples, sorted(loaded)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget", type=float, default=float(os.getenv("IMPORT_BUDGET_SECONDS", "1.0")))
+    args = parser.parse_args()
+
+    samples, loaded = measure(args.runs)
+    median = statistics.median(samples)
+    report = {
+        "benchmark": "server_import",
+        "runs": args.runs,
+        "median_seconds": round(median, 4),
+        "max_seconds": round(max(samples), 4),
+        "budget_seconds": args.budget,
+        "eager_heavy_modules": loaded,
+    }
+    print(json.dumps(report, indent=2))
+
+    if median > args.budget or loaded:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
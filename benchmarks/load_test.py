@@ -0,0 +1,276 @@
+"""Load test for the /generate endpoint.
+
+Drives ``server.app`` in-process (through an ASGI transport) or through a
+local uvicorn process, with OpenAI, Blob Storage and Drive replaced by the
+fakes in ``benchmarks.fakes``. For each concurrency level it reports
+throughput, p50/p95/p99 latency, error rate and peak RSS as JSON.
+
+    python benchmarks/load_test.py --concurrency 1 4 16 64 --requests 64 --llm-latency 0.5
+    python benchmarks/load_test.py --target uvicorn --concurrency 8 32 128
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import (  # noqa: E402
+    Latency, configure_environment, install_fakes, make_image, synthetic_cost_json
+)
+
+
+def _percentile(samples, q):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+
+# -----------------------------
+# Peak RSS while a level runs
+# -----------------------------
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if pid == os.getpid():
+        # No /proc: fall back to the process-wide high-water mark (KB on Linux, bytes on macOS)
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+    return None
+
+
+class RssSampler:
+    def __init__(self, pid, interval=0.05):
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, _rss_bytes(self.pid) or 0)
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, _rss_bytes(self.pid) or 0)
+
+
+# -----------------------------
+# Load generation
+# -----------------------------
+def _payload(args, image_path, index):
+    return {
+        "image_uri": image_path,
+        "client_name": "loadtest",
+        "use_case_name": f"request_{index}",
+        "markets": [{"market": "M2", "multiplier": 0.5, "start_month": 4}],
+        "refresh": not args.cached,
+        "mode": args.mode,
+    }
+
+
+async def run_level(client, args, image_path, concurrency, pid):
+    counter = itertools.count()
+    latencies = []
+    errors = {}
+
+    async def worker():
+        while True:
+            index = next(counter)
+            if index >= args.requests:
+                return
+            start = time.perf_counter()
+            try:
+                response = await client.post("/generate", json=_payload(args, image_path, index))
+                failed = None if response.status_code == 200 else f"HTTP {response.status_code}"
+            except Exception as e:
+                failed = type(e).__name__
+            elapsed = time.perf_counter() - start
+            if failed:
+                errors[failed] = errors.get(failed, 0) + 1
+            else:
+                latencies.append(elapsed)
+
+    with RssSampler(pid) as rss:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        wall = time.perf_counter() - start
+
+    failed = sum(errors.values())
+    return {
+        "concurrency": concurrency,
+        "requests": args.requests,
+        "wall_seconds": round(wall, 4),
+        "throughput_rps": round(len(latencies) / wall, 3),
+        "p50_seconds": _round(_percentile(latencies, 50)),
+        "p95_seconds": _round(_percentile(latencies, 95)),
+        "p99_seconds": _round(_percentile(latencies, 99)),
+        "error_rate": round(failed / args.requests, 4),
+        "errors": errors,
+        "peak_rss_mb": round(rss.peak / 1024 / 1024, 1),
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 4)
+
+
+def _latency(args):
+    return Latency(args.llm_latency, args.chunk_latency, args.blob_latency, args.drive_latency)
+
+
+def _install(args):
+    install_fakes(synthetic_cost_json(args.components), _latency(args), chunk_chars=args.chunk_chars)
+
+
+async def sweep_in_process(args, image_path):
+    import httpx
+    from server import app
+
+    _install(args)
+    transport = httpx.ASGITransport(app=app)
+    results = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+        for concurrency in args.concurrency:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results.append(await run_level(client, args, image_path, concurrency, os.getpid()))
+    return results
+
+
+async def sweep_uvicorn(args, image_path):
+    import httpx
+
+    command = [sys.executable, os.path.abspath(__file__), "--serve", "--port", str(args.port)] + _fake_args(args)
+    server = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, env=os.environ.copy())
+    results = []
+    try:
+        async with httpx.AsyncClient(
+            base_url=f"http://127.0.0.1:{args.port}",
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=max(args.concurrency)),
+        ) as client:
+            await _wait_until_up(client, server)
+            for concurrency in args.concurrency:
+                results.append(await run_level(client, args, image_path, concurrency, server.pid))
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+async def _wait_until_up(client, server, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"uvicorn exited with status {server.returncode}")
+        try:
+            await client.get("/cache/stats")
+            return
+        except Exception:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def _fake_args(args):
+    return [
+        "--components", str(args.components),
+        "--llm-latency", str(args.llm_latency),
+        "--chunk-latency", str(args.chunk_latency),
+        "--blob-latency", str(args.blob_latency),
+        "--drive-latency", str(args.drive_latency),
+        "--chunk-chars", str(args.chunk_chars),
+    ]
+
+
+def serve(args):
+    # Child process for --target uvicorn: the app with fakes installed
+    import uvicorn
+    from server import app
+
+    _install(args)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning", access_log=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", choices=["inprocess", "uvicorn"], default="inprocess")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--mode", choices=["three_call", "two_call", "fused"], default=None)
+    parser.add_argument("--cached", action="store_true", help="let repeated requests hit the LLM cache")
+    parser.add_argument("--components", type=int, default=100)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per model call")
+    parser.add_argument("--chunk-latency", type=float, default=0.0, help="seconds per streamed chunk")
+    parser.add_argument("--blob-latency", type=float, default=0.05, help="seconds per Blob request")
+    parser.add_argument("--drive-latency", type=float, default=0.05, help="seconds per Drive request")
+    parser.add_argument("--chunk-chars", type=int, default=256)
+    parser.add_argument("--image-side", type=int, default=2048)
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        os.chdir(ROOT)
+        return serve(args)
+
+    output = os.path.abspath(args.output) if args.output else None
+
+    with tempfile.TemporaryDirectory(prefix="cost-estimator-load-") as workdir:
+        configure_environment(workdir)
+        # Startup warm-up would only add noise; the fakes are already "warm"
+        os.environ["WARMUP_ON_STARTUP"] = "false"
+        os.chdir(ROOT)
+        image_path = make_image(os.path.join(workdir, "diagram.png"), args.image_side)
+
+        sweep = sweep_uvicorn if args.target == "uvicorn" else sweep_in_process
+        levels = asyncio.run(sweep(args, image_path))
+
+    report = {
+        "benchmark": "load_generate",
+        "target": args.target,
+        "python": platform.python_version(),
+        "config": {
+            "mode": args.mode,
+            "cached": args.cached,
+            "components": args.components,
+            "latency": _latency(args).as_dict(),
+        },
+        "levels": levels,
+    }
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""Offline pipeline benchmark.
+
+Runs ``run_llm_pipeline`` against the local fakes in ``benchmarks.fakes`` and
+times every stage, then times ``apply_cost_engine`` plus
+``generate_cost_excel_combined`` on their own, for synthetic cost JSONs of
+each requested size. Results are printed (or written) as JSON so runs can be
+compared between commits.
+
+    python benchmarks/pipeline.py --components 10 100 1000 10000 --runs 3 --output bench.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.fakes import (  # noqa: E402
+    Latency, configure_environment, install_fakes, make_image, synthetic_cost_json
+)
+
+STAGES = [
+    "extract_document",
+    "analyze_image",
+    "architecture_from_image",
+    "architecture_text",
+    "cost_json",
+    "cost_json_fused",
+    "parse_json",
+    "excel",
+    "blob_upload",
+    "drive_upload",
+]
+
+
+def _summary(samples):
+    return {
+        "median_seconds": round(statistics.median(samples), 6),
+        "min_seconds": round(min(samples), 6),
+        "max_seconds": round(max(samples), 6),
+    }
+
+
+def _stage_totals():
+    from prometheus_client import REGISTRY
+
+    totals = {}
+    for stage in STAGES:
+        total = REGISTRY.get_sample_value("pipeline_stage_seconds_sum", {"stage": stage})
+        count = REGISTRY.get_sample_value("pipeline_stage_seconds_count", {"stage": stage})
+        totals[stage] = (total or 0.0, count or 0.0)
+    return totals
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -----------------------------
+# Benchmarks
+# -----------------------------
+def bench_pipeline(components, runs, latency, image_path, mode, description_chars, chunk_chars):
+    from llm.llm import run_llm_pipeline
+
+    fakes = install_fakes(synthetic_cost_json(components), latency, description_chars, chunk_chars)
+    per_stage = {stage: [] for stage in STAGES}
+    totals = []
+
+    for _ in range(runs):
+        before = _stage_totals()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            run_llm_pipeline(image_path, "bench", f"components_{components}", [], refresh=True, mode=mode)
+        totals.append(time.perf_counter() - start)
+
+        after = _stage_totals()
+        for stage in STAGES:
+            if after[stage][1] > before[stage][1]:
+                per_stage[stage].append(after[stage][0] - before[stage][0])
+
+    return {
+        "components": components,
+        "runs": runs,
+        "mode": mode,
+        "llm_calls_per_run": fakes.openai.calls / runs,
+        "total": _summary(totals),
+        "stages": {stage: _summary(samples) for stage, samples in per_stage.items() if samples},
+    }
+
+
+def bench_excel(components, runs):
+    from llm.cost_engine import apply_cost_engine
+    from excel.excel_writer_combined import generate_cost_excel_combined
+
+    raw = synthetic_cost_json(components)
+    markets = [{"market": "M2", "multiplier": 0.5, "start_month": 4}]
+    engine, excel = [], []
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        cost_json = apply_cost_engine(json.loads(json.dumps(raw)))
+        engine.append(time.perf_counter() - start)
+
+        buffer = io.BytesIO()
+        start = time.perf_counter()
+        generate_cost_excel_combined(cost_json, buffer, "bench", "excel", None, markets)
+        excel.append(time.perf_counter() - start)
+
+    # Tracing slows allocation-heavy code several times over, so memory gets its own pass
+    tracemalloc.start()
+    generate_cost_excel_combined(cost_json, io.BytesIO(), "bench", "excel", None, markets)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "components": components,
+        "runs": runs,
+        "cost_engine": _summary(engine),
+        "excel": _summary(excel),
+        "excel_peak_python_mb": round(peak / 1024 / 1024, 3),
+        "workbook_bytes": len(buffer.getvalue()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--components", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--mode", choices=["three_call", "two_call", "fused"], default="three_call")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="seconds per model call")
+    parser.add_argument("--chunk-latency", type=float, default=0.0, help="seconds per streamed chunk")
+    parser.add_argument("--blob-latency", type=float, default=0.0, help="seconds per Blob request")
+    parser.add_argument("--drive-latency", type=float, default=0.0, help="seconds per Drive request")
+    parser.add_argument("--image-side", type=int, default=2048, help="synthetic diagram width in pixels")
+    parser.add_argument("--description-chars", type=int, default=2000)
+    parser.add_argument("--chunk-chars", type=int, default=256)
+    parser.add_argument("--skip-pipeline", action="store_true")
+    parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    latency = Latency(args.llm_latency, args.chunk_latency, args.blob_latency, args.drive_latency)
+    output = os.path.abspath(args.output) if args.output else None
+
+    with tempfile.TemporaryDirectory(prefix="cost-estimator-bench-") as workdir:
+        configure_environment(workdir)
+        # Prompts are loaded relative to the repository root
+        os.chdir(ROOT)
+        image_path = make_image(os.path.join(workdir, "diagram.png"), args.image_side)
+
+        report = {
+            "benchmark": "pipeline",
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "config": {
+                "mode": args.mode,
+                "latency": latency.as_dict(),
+                "image_side": args.image_side,
+                "description_chars": args.description_chars,
+                "chunk_chars": args.chunk_chars,
+            },
+            "pipeline": [],
+            "excel": [],
+        }
+        for components in args.components:
+            if not args.skip_pipeline:
+                report["pipeline"].append(bench_pipeline(
+                    components, args.runs, latency, image_path, args.mode,
+                    args.description_chars, args.chunk_chars
+                ))
+            report["excel"].append(bench_excel(components, args.runs))
+
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,11 @@
 # excel_writer_combined.py
 import openpyxl
+from openpyxl.cell import Cell, WriteOnlyCell
 from openpyxl.styles import Font, Alignment, PatternFill, NamedStyle
 from openpyxl.drawing.image import Image as XLImage
 from openpyxl.utils import get_column_letter
 from decimal import Decimal
+import math
 import os
 
 
@@ -38,17 +40,47 @@ def _normalize_string(v):
     return str(v)
 
 
-def auto_fit_columns(ws, extra_padding=4):
-    for col in ws.columns:
-        max_len = 0
-        col_letter = get_column_letter(col[0].column)
-        for cell in col:
-            try:
-                length = len(str(cell.value)) if cell.value else 0
-                max_len = max(max_len, length)
-            except:
-                pass
-        ws.column_dimensions[col_letter].width = max_len + extra_padding
+def _column_widths(rows, extra_padding=4):
+    # Longest rendered value per column plus padding, as the rows are produced
+    widths = {}
+    for row in rows:
+        for col, value in enumerate(row, 1):
+            if isinstance(value, Cell):
+                value = value.value
+            length = len(str(value)) if value else 0
+            widths[col] = max(widths.get(col, 0), length)
+    return {col: width + extra_padding for col, width in widths.items()}
+
+
+def _stream_rows(ws, make_rows):
+    """Append the rows produced by ``make_rows()`` to a write-only sheet.
+
+    Column widths have to be known before the first row is written, so the
+    generator is run once to size the columns and once to write, which keeps
+    memory flat however many rows the estimate has.
+    """
+    for col, width in _column_widths(make_rows()).items():
+        ws.column_dimensions[get_column_letter(col)].width = width
+
+    for row in make_rows():
+        ws.append(row)
+
+
+def _styled(ws, value, font=None, fill=None, alignment=None, number_format=None):
+    cell = WriteOnlyCell(ws, value=value)
+    if font:
+        cell.font = font
+    if fill:
+        cell.fill = fill
+    if alignment:
+        cell.alignment = alignment
+    if number_format:
+        cell.number_format = number_format
+    return cell
+
+
+def _header_row(ws, headers):
+    return [_styled(ws, h, font=HEADER_FONT, fill=HEADER_FILL) for h in headers]
 
 
 HEADER_FILL = PatternFill(start_color="ADD8E6", end_color="ADD8E6", fill_type="solid")
@@ -67,14 +99,18 @@ NUMBER_STYLE.number_format = "#,##0.00"
 # -------------------------------------------------------------------
 # ARCHITECTURE DIAGRAM SHEET (unchanged)
 # -------------------------------------------------------------------
-def write_architecture_diagram_sheet(wb, image_path, use_case_name):
-    ws = wb.create_sheet(f"Architecture_{use_case_name}")
-
-    ws["A1"] = "Architecture Diagram"
-    ws["A1"].font = TITLE_FONT
-
-    if not image_path or not os.path.exists(image_path):
-        ws["A3"] = "Architecture diagram not available."
+def write_architecture_diagram_sheet(wb, image_path, use_case_name, index=None):
+    # Numbered when the estimate has several diagrams
+    suffix = f"_{index}" if index else ""
+    ws = wb.create_sheet(f"Architecture_{use_case_name}{suffix}")
+
+    title = _styled(ws, "Architecture Diagram", font=TITLE_FONT)
+
+    # image_path may also be an in-memory image (file-like object)
+    if not image_path or (isinstance(image_path, str) and not os.path.exists(image_path)):
+        ws.append([title])
+        ws.append([])
+        ws.append(["Architecture diagram not available."])
         return ws
 
     img = XLImage(image_path)
@@ -88,109 +124,86 @@ def write_architecture_diagram_sheet(wb, image_path, use_case_name):
     ws.column_dimensions["A"].width = 120
     ws.row_dimensions[3].height = 400
 
+    ws.append([title])
+    ws.append([])
+    ws.append([])
     return ws
 
 # -------------------------------------------------------------------
 # BASELINE ASSUMPTION SHEET
 # -------------------------------------------------------------------
-def write_combined_sheet(wb, baseline_list, cost_components, pipelines):
-
-    ws = wb.create_sheet("Baseline_cost_assumption")
-
-    row = 1
-    ws.merge_cells(start_row=row, start_column=1, end_row=row, end_column=6)
-    ws.cell(row=row, column=1).value = "CLOUD COST ESTIMATION OVERVIEW"
-    ws.cell(row=row, column=1).font = TITLE_FONT
-    ws.cell(row=row, column=1).alignment = Alignment(horizontal="center")
-    row += 2
+def _combined_rows(ws, baseline_list, cost_components, pipelines):
+    yield [_styled(ws, "CLOUD COST ESTIMATION OVERVIEW", font=TITLE_FONT,
+                   alignment=Alignment(horizontal="center"))]
+    yield []
 
     # ---------------------------------------------------------
     # BASELINE SUMMARY
     # ---------------------------------------------------------
-    ws.cell(row=row, column=1).value = "Baseline Summary"
-    ws.cell(row=row, column=1).font = HEADER_FONT
-    row += 1
-
-    headers = ["Parameter", "Usecase Details", "Source of Assumption", "Notes"]
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col, value=h)
-        cell.font = HEADER_FONT
-        cell.fill = HEADER_FILL
-    row += 1
+    yield [_styled(ws, "Baseline Summary", font=HEADER_FONT)]
+    yield _header_row(ws, ["Parameter", "Usecase Details", "Source of Assumption", "Notes"])
 
     for entry in baseline_list:
-        ws.append([
+        yield [
             entry.get("parameter", ""),
             _normalize_string(entry.get("usecase_details", "")),
             _normalize_string(entry.get("source_of_assumption", "")),
             _normalize_string(entry.get("notes", ""))
-        ])
-        row += 1
+        ]
 
-    row += 2  # 2 row gap
+    yield []  # 2 row gap
+    yield []
 
     # ---------------------------------------------------------
     # COST COMPONENTS
     # ---------------------------------------------------------
-    ws.cell(row=row, column=1).value = "Detailed Cost Components"
-    ws.cell(row=row, column=1).font = HEADER_FONT
-    row += 1
-
-    headers = ["Cost Component", "Calculation Logic", "Cost ($)", "Source", "Remarks"]
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col, value=h)
-        cell.font = HEADER_FONT
-        cell.fill = HEADER_FILL
-    row += 1
+    yield [_styled(ws, "Detailed Cost Components", font=HEADER_FONT)]
+    yield _header_row(ws, ["Cost Component", "Calculation Logic", "Cost ($)", "Source", "Remarks"])
 
     for comp in cost_components:
         cost_val = _try_number(comp.get("cost_usd", ""))
-        row_values = [
+
+        # Cost → currency formatting
+        if isinstance(cost_val, (float, int)):
+            cost_val = _styled(ws, cost_val, number_format=CURRENCY.number_format)
+
+        yield [
             comp.get("component", ""),
             comp.get("calculation_logic", ""),
             cost_val,
             comp.get("source", ""),
             comp.get("remarks", "")
         ]
-        ws.append(row_values)
 
-        # Cost → currency formatting
-        cell = ws.cell(row=row, column=3)
-        if isinstance(cost_val, (float, int)):
-            cell.number_format = CURRENCY.number_format
-        row += 1
-
-    row += 2
+    yield []
+    yield []
 
     # ---------------------------------------------------------
     # PIPELINE GROUPS
     # ---------------------------------------------------------
-    ws.cell(row=row, column=1).value = "Pipeline Groups"
-    ws.cell(row=row, column=1).font = HEADER_FONT
-    row += 1
-
-    headers = [
+    yield [_styled(ws, "Pipeline Groups", font=HEADER_FONT)]
+    yield _header_row(ws, [
         "Pipeline Group", "Data Sources Included", "Refresh Frequency",
         "Runs/Month", "Avg Hours/Run", "Total Hours/Month"
-    ]
-    for col, h in enumerate(headers, 1):
-        cell = ws.cell(row=row, column=col, value=h)
-        cell.font = HEADER_FONT
-        cell.fill = HEADER_FILL
-    row += 1
+    ])
 
     for p in pipelines:
-        ws.append([
+        yield [
             p.get("pipeline_name", ""),
             _normalize_string(p.get("data_sources_included", "")),
             p.get("refresh_frequency", ""),
             _try_number(p.get("runs_per_month", "")),
             _try_number(p.get("avg_hours_per_run", "")),
             _try_number(p.get("total_hours_per_month", ""))
-        ])
-        row += 1
+        ]
+
 
-    auto_fit_columns(ws)
+def write_combined_sheet(wb, baseline_list, cost_components, pipelines):
+
+    ws = wb.create_sheet("Baseline_cost_assumption")
+    ws.merged_cells.add("A1:F1")
+
+    _stream_rows(ws, lambda: _combined_rows(ws, baseline_list, cost_components, pipelines))
     return ws
 
 # -------------------------------------------------------------------
@@ -207,7 +220,6 @@ def write_monthly_environment_sheet(wb, monthly_env, markets=None):
         market_timeline.extend(markets)
 
     active_markets_per_month = {}
-    multiplier_per_month = {}
 
     for m in range(1, 13):
         active = [
@@ -215,69 +227,85 @@ def write_monthly_environment_sheet(wb, monthly_env, markets=None):
             for mk in market_timeline
             if mk["start_month"] <= m
         ]
-        multiplier_sum = sum(
-            mk["multiplier"]
-            for mk in market_timeline
-            if mk["start_month"] <= m
-        )
 
         active_markets_per_month[m] = "+".join(active)
-        multiplier_per_month[m] = multiplier_sum
 
-    # -----------------------------
-    # Header rows (shifted right)
-    # -----------------------------
-    ws.append(["", "Months"] + [f"m{i}" for i in range(1, 13)] + ["Total"])
-    ws.append(
-        ["", "Markets"] +
-        [active_markets_per_month[i] for i in range(1, 13)] +
-        [""]
-    )
-
-    for row in (1, 2):
-        for cell in ws[row]:
-            cell.font = HEADER_FONT
-            cell.fill = HEADER_FILL
-            
-    # -----------------------------
-    # Environment rows (shifted right)
-    # -----------------------------
-    for env in ("Dev", "QA", "Prod"):
-        record = monthly_env.get(env, {})
-        base_months = [_try_number(record.get(f"M{i}", 0)) for i in range(1, 13)]
-
-        final_months = []
-        for i in range(12):
-            val = base_months[i]
-            if isinstance(val, (int, float)):
-                final_months.append(round(val * multiplier_per_month[i + 1], 2))
-            else:
-                final_months.append("")
-
-        total = sum(v for v in final_months if isinstance(v, (int, float)))
-
-        ws.append(["", env] + final_months + [total])
-    ws["A3"] = "Environment"
-    ws["A3"].font = HEADER_FONT
-    ws["A3"].fill = HEADER_FILL
-    auto_fit_columns(ws)
+    # Same projection (and rounding) as the market scenario sweep, so both agree to the cent
+    from excel.scenarios import sweep_market_plans, ENVIRONMENTS
+
+    projections = sweep_market_plans(monthly_env, [markets or []])["projections"][0]
+
+    def rows():
+        # -----------------------------
+        # Header rows (shifted right)
+        # -----------------------------
+        for header in (
+            ["", "Months"] + [f"m{i}" for i in range(1, 13)] + ["Total"],
+            ["", "Markets"] + [active_markets_per_month[i] for i in range(1, 13)] + [""],
+        ):
+            yield _header_row(ws, header)
+
+        # -----------------------------
+        # Environment rows (shifted right)
+        # -----------------------------
+        for env, projected in zip(ENVIRONMENTS, projections):
+            # Non-numeric months are NaN in the projection
+            final_months = ["" if math.isnan(v) else float(v) for v in projected]
+
+            total = sum(v for v in final_months if isinstance(v, (int, float)))
+
+            label = _styled(ws, "Environment", font=HEADER_FONT, fill=HEADER_FILL) if env == "Dev" else ""
+            yield [label, env] + final_months + [total]
+
+    _stream_rows(ws, rows)
+    return ws
+
+
+# -------------------------------------------------------------------
+# MARKET SCENARIOS SHEET
+# -------------------------------------------------------------------
+def write_scenario_sheet(wb, ranked_plans):
+    ws = wb.create_sheet("Market_Scenarios")
+
+    def rows():
+        yield _header_row(
+            ws,
+            ["Rank", "Market Plan"] + [f"m{i}" for i in range(1, 13)] +
+            ["Dev Total", "QA Total", "Prod Total", "Total"]
+        )
+
+        for scenario in ranked_plans:
+            totals = scenario["environment_totals"]
+            yield (
+                [scenario["rank"], scenario["plan"] or "M1 only"] +
+                scenario["monthly_totals"] +
+                [totals["Dev"], totals["QA"], totals["Prod"], scenario["total"]]
+            )
+
+    _stream_rows(ws, rows)
     return ws
 
 
 # -------------------------------------------------------------------
 # MAIN ENTRY
 # -------------------------------------------------------------------
-def generate_cost_excel_combined(json_output, file_path, client_name, use_case_name, architecture_image_path=None, markets=None):
-    wb = openpyxl.Workbook()
-    wb.remove(wb.active)
+def generate_cost_excel_combined(json_output, output, client_name, use_case_name, architecture_image_path=None, markets=None, scenarios=None):
+    # Write-only workbook: rows are streamed to the file as they are produced
+    wb = openpyxl.Workbook(write_only=True)
 
     baseline = json_output.get("baseline_summary", [])
     cost_components = json_output.get("detailed_cost_components", [])
     pipelines = json_output.get("pipeline_groups", [])
     monthly_env = json_output.get("monthly_environment_costs", {})
     
-    if architecture_image_path:
-        write_architecture_diagram_sheet(wb, architecture_image_path, use_case_name)
+    # One image (path or file-like object) or a list of them. A None entry in a list is a
+    # diagram that could not be fetched: it keeps its sheet (with a placeholder) and its number.
+    if isinstance(architecture_image_path, list):
+        images = architecture_image_path
+    else:
+        images = [architecture_image_path] if architecture_image_path else []
+    for index, image in enumerate(images, 1):
+        write_architecture_diagram_sheet(wb, image, use_case_name, index if len(images) > 1 else None)
         
     write_combined_sheet(wb, baseline, cost_components, pipelines)
     # write_monthly_environment_sheet(wb, monthly_env)
@@ -285,5 +313,9 @@ def generate_cost_excel_combined(json_output, file_path, client_name, use_case_n
     # if(markets):
     write_monthly_environment_sheet(wb, monthly_env, markets)
 
-    wb.save(file_path)
-    return file_path
\ No newline at end of file
+    if scenarios:
+        write_scenario_sheet(wb, scenarios)
+
+    # output may be a path or a writable binary buffer such as io.BytesIO
+    wb.save(output)
+    return output
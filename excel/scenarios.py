@@ -0,0 +1,80 @@
+# scenarios.py
+import numpy as np
+from excel.excel_writer_combined import _try_number
+
+ENVIRONMENTS = ("Dev", "QA", "Prod")
+MONTHS = np.arange(1, 13)
+
+
+def _base_matrix(monthly_env):
+    # environments x months; non-numeric months become NaN and drop out of totals
+    base = np.full((len(ENVIRONMENTS), len(MONTHS)), np.nan)
+    for i, env in enumerate(ENVIRONMENTS):
+        record = monthly_env.get(env, {})
+        for m in MONTHS:
+            val = _try_number(record.get(f"M{m}", 0))
+            if isinstance(val, (int, float)):
+                base[i, m - 1] = val
+    return base
+
+
+def _describe_plan(plan):
+    return " + ".join(f"{mk['market']} x{mk['multiplier']:g} from m{mk['start_month']}" for mk in plan)
+
+
+# -------------------------------------------------------------------
+# MARKET SCENARIO SWEEP
+# Every plan gets the same M1 base market as the Yearly_Cost sheet.
+# -------------------------------------------------------------------
+def sweep_market_plans(monthly_env, plans):
+    base = _base_matrix(monthly_env)
+
+    width = max((len(plan) for plan in plans), default=0)
+    multipliers = np.zeros((len(plans), width))
+    start_months = np.full((len(plans), width), len(MONTHS) + 1)
+    for i, plan in enumerate(plans):
+        for j, mk in enumerate(plan):
+            multipliers[i, j] = mk["multiplier"]
+            start_months[i, j] = mk["start_month"]
+
+    # plans x markets x months
+    active = start_months[:, :, None] <= MONTHS[None, None, :]
+    multiplier_per_month = 1.0 + (multipliers[:, :, None] * active).sum(axis=1)
+
+    # plans x environments x months
+    projections = np.round(base[None, :, :] * multiplier_per_month[:, None, :], 2)
+    env_totals = np.nansum(projections, axis=2)
+
+    return {
+        "multiplier_per_month": multiplier_per_month,
+        "projections": projections,
+        "environment_totals": env_totals,
+        "totals": env_totals.sum(axis=1),
+    }
+
+
+def rank_market_plans(monthly_env, plans, top_n=None, descending=False):
+    sweep = sweep_market_plans(monthly_env, plans)
+    totals = sweep["totals"]
+
+    order = np.argsort(-totals if descending else totals, kind="stable")
+    if top_n is not None:
+        order = order[:top_n]
+
+    monthly_totals = np.nansum(sweep["projections"], axis=1)
+
+    return [
+        {
+            "rank": rank,
+            "plan_index": int(i),
+            "plan": _describe_plan(plans[i]),
+            "markets": plans[i],
+            "monthly_totals": [round(float(v), 2) for v in monthly_totals[i]],
+            "environment_totals": {
+                env: round(float(sweep["environment_totals"][i, e]), 2)
+                for e, env in enumerate(ENVIRONMENTS)
+            },
+            "total": round(float(totals[i]), 2),
+        }
+        for rank, i in enumerate(order, 1)
+    ]
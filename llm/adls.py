@@ -1,9 +1,27 @@
+from azure.core.exceptions import ResourceExistsError, ResourceNotFoundError
 from azure.storage.blob import BlobServiceClient, BlobSasPermissions, generate_blob_sas
 from datetime import datetime, timedelta, timezone
+from llm.delivery import run_blocking_io
+import asyncio
+import importlib.util
 import os
+import threading
+import weakref
 
+CONTAINER_NAME = "finops-output"
 
-def upload_to_blob_with_sas(file_path, client_name, use_case_name, file_name):
+# The aio Blob client needs aiohttp as its transport; without it the async path
+# uploads with the blocking client on a worker thread instead
+ASYNC_TRANSPORT_AVAILABLE = importlib.util.find_spec("aiohttp") is not None
+
+_lock = threading.Lock()
+_blob_service = None
+_async_blob_services = weakref.WeakKeyDictionary()
+_account = None
+_ensured_containers = set()
+
+
+def _connection():
     connect_str = os.getenv("AZURE_STORAGE_CONNECTION_STRING")
     if not connect_str:
         raise ValueError("AZURE_STORAGE_CONNECTION_STRING not set")
@@ -20,26 +38,43 @@ def upload_to_blob_with_sas(file_path, client_name, use_case_name, file_name):
     if not account_name or not account_key:
         raise ValueError("Connection string missing AccountName or AccountKey")
 
-    blob_service = BlobServiceClient.from_connection_string(connect_str)
-    container_name = "finops-output"
+    return connect_str, (account_name, account_key)
+
+
+# -----------------------------
+# Process-wide Blob client (created once)
+# -----------------------------
+def get_blob_service():
+    global _blob_service, _account
+
+    if _blob_service is not None:
+        return _blob_service, _account
+
+    with _lock:
+        if _blob_service is None:
+            connect_str, _account = _connection()
+            _blob_service = BlobServiceClient.from_connection_string(connect_str)
+
+    return _blob_service, _account
+
+
+def ensure_container(blob_service, container_name):
     container = blob_service.get_container_client(container_name)
 
-    # Create container if it doesn't exist
+    if container_name in _ensured_containers:
+        return container
+
+    # Create container if it doesn't exist; any other failure (auth, permissions) propagates
     try:
         container.create_container()
-    except:
+    except ResourceExistsError:
         pass
 
-    # 👇 THIS IS THE IMPORTANT PART
-    blob_path = f"{client_name}/{use_case_name}/{file_name}"
+    _ensured_containers.add(container_name)
+    return container
 
-    with open(file_path, "rb") as f:
-        container.upload_blob(
-            name=blob_path,
-            data=f,
-            overwrite=True
-        )
 
+def _sas_url(account_name, account_key, container_name, blob_path):
     sas_token = generate_blob_sas(
         account_name=account_name,
         account_key=account_key,
@@ -50,4 +85,81 @@ def upload_to_blob_with_sas(file_path, client_name, use_case_name, file_name):
         expiry=datetime.now(timezone.utc) + timedelta(hours=1),
     )
 
-    return f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_path}?{sas_token}" 
\ No newline at end of file
+    return f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_path}?{sas_token}"
+
+
+def upload_to_blob_with_sas(data, client_name, use_case_name, file_name):
+    blob_service, (account_name, account_key) = get_blob_service()
+    container_name = CONTAINER_NAME
+    container = ensure_container(blob_service, container_name)
+
+    # 👇 THIS IS THE IMPORTANT PART
+    blob_path = f"{client_name}/{use_case_name}/{file_name}"
+
+    try:
+        container.upload_blob(name=blob_path, data=data, overwrite=True)
+    except ResourceNotFoundError:
+        # Container was deleted since we cached it; recreate and retry once
+        _ensured_containers.discard(container_name)
+        container = ensure_container(blob_service, container_name)
+        container.upload_blob(name=blob_path, data=data, overwrite=True)
+
+    return _sas_url(account_name, account_key, container_name, blob_path)
+
+
+# -----------------------------
+# Async client for the event-loop pipeline
+# Bound to the loop it is created on, so there is one per loop (see llm.llm.get_async_client).
+# -----------------------------
+def get_async_blob_service():
+    global _account
+
+    loop = asyncio.get_running_loop()
+    if loop not in _async_blob_services:
+        from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
+        connect_str, _account = _connection()
+        _async_blob_services[loop] = AsyncBlobServiceClient.from_connection_string(connect_str)
+
+    return _async_blob_services[loop], _account
+
+
+async def close_async_blob_service():
+    blob_service = _async_blob_services.pop(asyncio.get_running_loop(), None)
+    if blob_service is not None:
+        await blob_service.close()
+
+
+async def ensure_container_async(blob_service, container_name):
+    container = blob_service.get_container_client(container_name)
+
+    if container_name in _ensured_containers:
+        return container
+
+    try:
+        await container.create_container()
+    except ResourceExistsError:
+        pass
+
+    _ensured_containers.add(container_name)
+    return container
+
+
+async def upload_to_blob_with_sas_async(data, client_name, use_case_name, file_name):
+    if not ASYNC_TRANSPORT_AVAILABLE:
+        return await run_blocking_io(upload_to_blob_with_sas, data, client_name, use_case_name, file_name)
+
+    blob_service, (account_name, account_key) = get_async_blob_service()
+    container_name = CONTAINER_NAME
+    container = await ensure_container_async(blob_service, container_name)
+
+    blob_path = f"{client_name}/{use_case_name}/{file_name}"
+
+    try:
+        await container.upload_blob(name=blob_path, data=data, overwrite=True)
+    except ResourceNotFoundError:
+        _ensured_containers.discard(container_name)
+        container = await ensure_container_async(blob_service, container_name)
+        await container.upload_blob(name=blob_path, data=data, overwrite=True)
+
+    return _sas_url(account_name, account_key, container_name, blob_path)
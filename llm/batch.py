@@ -0,0 +1,65 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from llm.llm import run_llm_pipeline
+import os
+import time
+import traceback
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+
+
+# -----------------------------
+# Run many estimates with bounded concurrency
+# -----------------------------
+def run_batch(requests, concurrency=BATCH_CONCURRENCY):
+    """Yield one result per request as it finishes, then a summary of all links."""
+    started = time.perf_counter()
+    results = []
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="batch")
+
+    try:
+        futures = {
+            pool.submit(run_llm_pipeline, **request): (index, request)
+            for index, request in enumerate(requests)
+        }
+
+        for future in as_completed(futures):
+            index, request = futures[future]
+            item = {
+                "index": index,
+                "client_name": request["client_name"],
+                "use_case_name": request["use_case_name"],
+            }
+
+            try:
+                item.update(status="success", **future.result())
+            except Exception as e:
+                traceback.print_exc()
+                item.update(status="failed", error=str(e))
+
+            results.append(item)
+            yield item
+
+    finally:
+        # Stop queued work if the caller goes away before the batch finishes
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    results.sort(key=lambda r: r["index"])
+    yield {
+        "summary": {
+            "total": len(results),
+            "succeeded": sum(r["status"] == "success" for r in results),
+            "failed": sum(r["status"] == "failed" for r in results),
+            "elapsed_seconds": round(time.perf_counter() - started, 3),
+            "links": [
+                {
+                    "index": r["index"],
+                    "client_name": r["client_name"],
+                    "use_case_name": r["use_case_name"],
+                    "azure_sas_url": r.get("azure_sas_url"),
+                    "drive_link": r.get("drive_link"),
+                }
+                for r in results
+                if r["status"] == "success"
+            ],
+        }
+    }
@@ -0,0 +1,117 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MAX_MB = float(os.getenv("LLM_CACHE_MAX_MB", "256"))
+LLM_CACHE_TTL_HOURS = float(os.getenv("LLM_CACHE_TTL_HOURS", "168"))
+
+_caches = {}
+
+
+def cache_key(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode("utf-8")
+        digest.update(hashlib.sha256(part or b"").digest())
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """Persistent key/value cache with size-bounded LRU eviction and a TTL."""
+
+    def __init__(self, name, path=LLM_CACHE_PATH, max_bytes=None, ttl_seconds=None):
+        self.name = name
+        self.path = path
+        self.max_bytes = int(LLM_CACHE_MAX_MB * 1024 * 1024) if max_bytes is None else max_bytes
+        self.ttl_seconds = LLM_CACHE_TTL_HOURS * 3600 if ttl_seconds is None else ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        _caches[name] = self
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                f"""
+                CREATE TABLE IF NOT EXISTS "{self.name}" (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            row = db.execute(
+                f'SELECT value, created_at FROM "{self.name}" WHERE key = ?', (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    db.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+                    db.commit()
+                self.misses += 1
+                return None
+
+            db.execute(f'UPDATE "{self.name}" SET accessed_at = ? WHERE key = ?', (now, key))
+            db.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            db = self._db()
+            db.execute(
+                f'INSERT OR REPLACE INTO "{self.name}" (key, value, size, created_at, accessed_at) '
+                f"VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict(db, now)
+            db.commit()
+
+    def _evict(self, db, now):
+        db.execute(f'DELETE FROM "{self.name}" WHERE created_at < ?', (now - self.ttl_seconds,))
+
+        total = db.execute(f'SELECT COALESCE(SUM(size), 0) FROM "{self.name}"').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until the cache fits again
+        for key, size in db.execute(
+            f'SELECT key, size FROM "{self.name}" ORDER BY accessed_at'
+        ).fetchall():
+            db.execute(f'DELETE FROM "{self.name}" WHERE key = ?', (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._db().execute(
+                f'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM "{self.name}"'
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": entries,
+            "size_bytes": size,
+        }
+
+
+def cache_stats():
+    return {name: cache.stats() for name, cache in _caches.items()}
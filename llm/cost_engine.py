@@ -0,0 +1,109 @@
+import numpy as np
+
+ENVIRONMENTS = ("Dev", "QA", "Prod")
+MONTHS = 12
+
+
+def _to_float(v, default=0.0):
+    if v is None or isinstance(v, bool):
+        return default
+    if isinstance(v, (int, float)):
+        return float(v)
+    s = str(v).strip().replace(",", "").replace("$", "")
+    try:
+        return float(s)
+    except ValueError:
+        return default
+
+
+def _column(records, field):
+    return np.array([_to_float(r.get(field)) for r in records], dtype=float)
+
+
+# -------------------------------------------------------------------
+# DETERMINISTIC COST ENGINE
+# The LLM only supplies inputs (runs, runtimes, rates, quantities);
+# every derived figure in the workbook is calculated here.
+# -------------------------------------------------------------------
+def apply_cost_engine(cost_json):
+    inputs = cost_json.get("cost_inputs")
+    if not inputs:
+        # Estimates produced before the engine carry LLM-computed figures
+        return cost_json
+
+    result = dict(cost_json)
+
+    # -----------------------------
+    # Pipeline hours
+    # -----------------------------
+    pipelines = [dict(p) for p in cost_json.get("pipeline_groups", [])]
+    hours = _column(pipelines, "runs_per_month") * _column(pipelines, "avg_hours_per_run")
+    for pipeline, total in zip(pipelines, hours):
+        pipeline["total_hours_per_month"] = round(float(total), 2)
+    total_hours = float(hours.sum())
+
+    dbus_per_hour = _to_float(inputs.get("dbus_per_hour"))
+    dbu_rate = _to_float(inputs.get("dbu_rate_usd"))
+    compute_cost = total_hours * dbus_per_hour * dbu_rate
+
+    # -----------------------------
+    # Cost components
+    # -----------------------------
+    components = [dict(c) for c in cost_json.get("detailed_cost_components", [])]
+    costs = _column(components, "quantity") * _column(components, "unit_cost_usd")
+    for component, cost in zip(components, costs):
+        component["cost_usd"] = round(float(cost), 2)
+
+    components.insert(0, {
+        "component": "Databricks Compute",
+        "calculation_logic": (
+            f"{total_hours:,.2f} hours/month x {dbus_per_hour:g} DBU/hour x ${dbu_rate:g}/DBU"
+        ),
+        "cost_usd": round(compute_cost, 2),
+        "source": "Calculated",
+        "remarks": "Derived from pipeline groups and DBU rates",
+    })
+
+    base_monthly = compute_cost + float(costs.sum())
+
+    # -----------------------------
+    # Monthly environment costs (environments x months)
+    # -----------------------------
+    env_factors = inputs.get("environment_factors") or {}
+    factors = np.array([_to_float(env_factors.get(env), 1.0) for env in ENVIRONMENTS])
+    growth = (1.0 + _to_float(inputs.get("monthly_growth_rate"))) ** np.arange(MONTHS)
+
+    monthly = np.round(factors[:, None] * base_monthly * growth[None, :], 2)
+    totals = monthly.sum(axis=1)
+
+    result["monthly_environment_costs"] = {
+        env: {
+            **{f"M{m + 1}": float(monthly[i, m]) for m in range(MONTHS)},
+            "Total": round(float(totals[i]), 2),
+        }
+        for i, env in enumerate(ENVIRONMENTS)
+    }
+
+    # -----------------------------
+    # Baseline rows that follow from the inputs
+    # -----------------------------
+    calculated = {
+        "DBUs per Hour": dbus_per_hour,
+        "DBU Cost per Hour": round(dbus_per_hour * dbu_rate, 2),
+        "Total Runtime Hours (Monthly)": round(total_hours, 2),
+        "Raw DBU Cost": round(compute_cost, 2),
+        "Final Databricks Compute Cost (Dev Only)": round(compute_cost * factors[0], 2),
+    }
+
+    baseline = []
+    for entry in cost_json.get("baseline_summary", []):
+        entry = dict(entry)
+        if entry.get("parameter") in calculated:
+            entry["usecase_details"] = calculated[entry["parameter"]]
+            entry["source_of_assumption"] = "Calculated"
+        baseline.append(entry)
+
+    result["baseline_summary"] = baseline
+    result["detailed_cost_components"] = components
+    result["pipeline_groups"] = pipelines
+    return result
@@ -0,0 +1,74 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+import asyncio
+import contextvars
+import os
+import traceback
+
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "8"))
+
+# Long-lived threads so per-thread storage clients are reused across requests
+_pool = ThreadPoolExecutor(max_workers=UPLOAD_WORKERS, thread_name_prefix="upload")
+
+
+async def run_blocking_io(fn, *args):
+    """Run a blocking network call (upload, download) on this pool from the event loop.
+
+    Long transfers stay off the default executor, where they would hold up
+    the short steps (cache lookups, prompt reads) queued behind them.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _pool, partial(contextvars.copy_context().run, fn, *args)
+    )
+
+
+# -----------------------------
+# Fan out one workbook to every destination at once
+# -----------------------------
+def upload_to_destinations(destinations):
+    """Run each ``name -> callable`` upload concurrently and report per destination.
+
+    Each callable returns the link for its uploaded file. Total latency is that
+    of the slowest destination, not the sum of all of them.
+    """
+    results = {}
+    futures = {_pool.submit(upload): name for name, upload in destinations.items()}
+
+    for future in as_completed(futures):
+        name = futures[future]
+        results[name] = _outcome(name, future.result)
+
+    return results
+
+
+async def upload_to_destinations_async(destinations):
+    """``upload_to_destinations`` for ``name -> coroutine function`` uploads."""
+    names = list(destinations)
+    outcomes = await asyncio.gather(
+        *(destinations[name]() for name in names), return_exceptions=True
+    )
+
+    results = {}
+    for name, outcome in zip(names, outcomes):
+        results[name] = _outcome(name, lambda: _raise_or_return(outcome))
+    return results
+
+
+def _raise_or_return(outcome):
+    if isinstance(outcome, BaseException):
+        raise outcome
+    return outcome
+
+
+def _outcome(name, result):
+    try:
+        link = result()
+        if not link:
+            raise RuntimeError("upload returned no link")
+    except Exception as e:
+        traceback.print_exc()
+        print(f"Upload to {name} failed: {e}")
+        return {"status": "failed", "link": None, "error": str(e)}
+
+    print(f"Upload to {name} successful: {link}")
+    return {"status": "success", "link": link, "error": None}
@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+import json
+import os
+import sqlite3
+import threading
+
+ESTIMATE_STORE_PATH = os.getenv("ESTIMATE_STORE_PATH", "estimates.db")
+
+_lock = threading.Lock()
+_conn = None
+
+
+# -----------------------------
+# Parsed cost JSON per (client, use case)
+# -----------------------------
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(ESTIMATE_STORE_PATH, check_same_thread=False)
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS estimates (
+                client_name TEXT NOT NULL,
+                use_case_name TEXT NOT NULL,
+                cost_json TEXT NOT NULL,
+                image_uri TEXT,
+                updated_at TEXT NOT NULL,
+                PRIMARY KEY (client_name, use_case_name)
+            )
+            """
+        )
+        _conn.commit()
+    return _conn
+
+
+def save_estimate(client_name, use_case_name, cost_json, image_uri=None):
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT OR REPLACE INTO estimates "
+            "(client_name, use_case_name, cost_json, image_uri, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (
+                client_name,
+                use_case_name,
+                json.dumps(cost_json),
+                # Several diagrams are stored as a JSON list in the same column
+                json.dumps(image_uri) if isinstance(image_uri, list) else image_uri,
+                datetime.now(timezone.utc).isoformat(),
+            )
+        )
+        db.commit()
+
+
+def load_estimate(client_name, use_case_name):
+    with _lock:
+        row = _db().execute(
+            "SELECT cost_json, image_uri FROM estimates "
+            "WHERE client_name = ? AND use_case_name = ?",
+            (client_name, use_case_name)
+        ).fetchone()
+
+    if row is None:
+        return None
+
+    image_uri = row[1]
+    if image_uri and image_uri.startswith("["):
+        image_uri = json.loads(image_uri)
+
+    return {
+        "cost_json": json.loads(row[0]),
+        "image_uri": image_uri,
+    }
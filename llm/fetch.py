@@ -0,0 +1,110 @@
+from collections import OrderedDict
+import os
+import threading
+
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "30"))
+FETCH_CACHE_MAX_ITEMS = int(os.getenv("FETCH_CACHE_MAX_ITEMS", "32"))
+# URLs are user supplied; larger downloads are aborted instead of buffered
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(20 * 1024 * 1024)))
+
+IMAGE_CONTENT_TYPES = ("image/",)
+DOCUMENT_CONTENT_TYPES = ("application/pdf",)
+# Storage services often serve files without a specific type; the parsers check the bytes themselves
+GENERIC_CONTENT_TYPES = ("", "application/octet-stream", "binary/octet-stream")
+
+_lock = threading.Lock()
+_client = None
+_fetched = OrderedDict()
+_inflight = {}
+
+
+# One pooled client for the whole process (keep-alive connections are reused)
+def get_http_client():
+    global _client
+    with _lock:
+        if _client is None:
+            import httpx
+
+            _client = httpx.Client(
+                timeout=FETCH_TIMEOUT_SECONDS,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+            )
+    return _client
+
+
+def is_remote(uri):
+    return isinstance(uri, str) and uri.lower().startswith(("http://", "https://"))
+
+
+# -----------------------------
+# Fetch once, share the bytes between consumers
+# -----------------------------
+def _check_content_type(url, media_type, content_types):
+    if media_type in GENERIC_CONTENT_TYPES or media_type.startswith(content_types):
+        return
+    raise ValueError(f"Unexpected content type '{media_type}' for {url}")
+
+
+def _download(url):
+    with get_http_client().stream("GET", url) as response:
+        response.raise_for_status()
+        media_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+
+        length = response.headers.get("content-length")
+        if length and length.isdigit() and int(length) > FETCH_MAX_BYTES:
+            raise ValueError(f"{url} is larger than {FETCH_MAX_BYTES} bytes")
+
+        chunks, size = [], 0
+        for chunk in response.iter_bytes():
+            size += len(chunk)
+            if size > FETCH_MAX_BYTES:
+                raise ValueError(f"{url} is larger than {FETCH_MAX_BYTES} bytes")
+            chunks.append(chunk)
+
+    return b"".join(chunks), media_type
+
+
+def fetch_bytes(url, content_types=IMAGE_CONTENT_TYPES):
+    with _lock:
+        if url in _fetched:
+            _fetched.move_to_end(url)
+            data, media_type = _fetched[url]
+            _check_content_type(url, media_type, content_types)
+            return data
+        url_lock = _inflight.setdefault(url, threading.Lock())
+
+    # Concurrent callers for the same URL wait for the first download
+    with url_lock:
+        try:
+            with _lock:
+                cached = _fetched.get(url)
+            if cached is None:
+                cached = _download(url)
+                with _lock:
+                    _fetched[url] = cached
+                    while len(_fetched) > FETCH_CACHE_MAX_ITEMS:
+                        _fetched.popitem(last=False)
+        finally:
+            with _lock:
+                _inflight.pop(url, None)
+
+    data, media_type = cached
+    _check_content_type(url, media_type, content_types)
+    return data
+
+
+def _read(uri, content_types):
+    if is_remote(uri):
+        return fetch_bytes(uri, content_types)
+
+    with open(uri, "rb") as f:
+        return f.read()
+
+
+def read_image_bytes(uri):
+    return _read(uri, IMAGE_CONTENT_TYPES)
+
+
+def read_document_bytes(uri):
+    return _read(uri, DOCUMENT_CONTENT_TYPES)
@@ -1,9 +1,52 @@
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaIoBaseUpload
 from googleapiclient.errors import HttpError
+import io
+import threading
+
+SCOPES = ["https://www.googleapis.com/auth/drive"]
+SERVICE_ACCOUNT_FILE = "google_drive_sa.json"
+
+_lock = threading.Lock()
+_credentials = None
+_local = threading.local()
+_validated_roots = set()
+_folder_ids = {}
+
+
+# -----------------------------
+# Pooled Drive client
+# Credentials are loaded once per process. The discovery-built service wraps
+# an httplib2 connection that is not thread-safe, so each worker thread keeps
+# its own long-lived instance.
+# -----------------------------
+def get_drive_credentials():
+    global _credentials
+
+    with _lock:
+        if _credentials is None:
+            _credentials = service_account.Credentials.from_service_account_file(
+                SERVICE_ACCOUNT_FILE,
+                scopes=SCOPES
+            )
+    return _credentials
+
+
+def get_drive_service():
+    service = getattr(_local, "service", None)
+    if service is not None:
+        return service
+
+    _local.service = build("drive", "v3", credentials=get_drive_credentials(), cache_discovery=False)
+    return _local.service
+
 
 def get_or_create_folder(service, folder_name, parent_id):
+    cached = _folder_ids.get((parent_id, folder_name))
+    if cached:
+        return cached
+
     query = (
         f"name='{folder_name}' and "
         f"mimeType='application/vnd.google-apps.folder' and "
@@ -21,6 +64,7 @@ def get_or_create_folder(service, folder_name, parent_id):
     files = results.get("files", [])
 
     if files:
+        _folder_ids[(parent_id, folder_name)] = files[0]["id"]
         return files[0]["id"]
 
     folder_metadata = {
@@ -35,9 +79,18 @@ def get_or_create_folder(service, folder_name, parent_id):
         supportsAllDrives=True
     ).execute()
 
+    _folder_ids[(parent_id, folder_name)] = folder["id"]
     return folder["id"]
 
 
+def invalidate_drive_path(root_folder_id, client_name):
+    # Forget cached folder IDs under this client after Drive reports a 404
+    client_folder_id = _folder_ids.pop((root_folder_id, client_name), None)
+    for key in [k for k in _folder_ids if k[0] == client_folder_id]:
+        _folder_ids.pop(key, None)
+    _validated_roots.discard(root_folder_id)
+
+
 # -----------------------------
 # Ensure ADLS-style path
 # root/client_name/use_case_name
@@ -61,9 +114,9 @@ def ensure_drive_path(service, root_folder_id, client_name, use_case_name):
 # -----------------------------
 # Upload file to Drive (Shared Drive safe)
 # -----------------------------
-def upload_file_to_drive(service, file_path, file_name, parent_folder_id):
-    media = MediaFileUpload(
-        file_path,
+def upload_file_to_drive(service, data, file_name, parent_folder_id):
+    media = MediaIoBaseUpload(
+        io.BytesIO(data),
         mimetype="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         resumable=True
     )
@@ -92,6 +145,9 @@ def upload_file_to_drive(service, file_path, file_name, parent_folder_id):
 # -----------------------------
 # In validate_shared_drive_access
 def validate_shared_drive_access(service, folder_id):
+    if folder_id in _validated_roots:
+        return
+
     try:
         folder = service.files().get(
             fileId=folder_id,
@@ -100,6 +156,7 @@ def validate_shared_drive_access(service, folder_id):
         ).execute()
 
         print("Shared Drive access confirmed:", folder["name"])
+        _validated_roots.add(folder_id)
 
     except HttpError as e:
         # Check if the error is the 404 "File not found"
@@ -117,24 +174,38 @@ def validate_shared_drive_access(service, folder_id):
 # Main upload function
 # -----------------------------
 def upload_to_drive(
-    file_path,
+    data,
     file_name,
     root_folder_id,
     client_name,
     use_case_name
 ):
-    SCOPES = ["https://www.googleapis.com/auth/drive"]
-    SERVICE_ACCOUNT_FILE = "google_drive_sa.json"
+    service = get_drive_service()
 
-    creds = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE,
-        scopes=SCOPES
+    validate_shared_drive_access(service, root_folder_id)
+
+    final_folder_id = ensure_drive_path(
+        service,
+        root_folder_id,
+        client_name,
+        use_case_name
     )
 
-    service = build("drive", "v3", credentials=creds)
+    # Upload file
+    try:
+        return upload_file_to_drive(
+            service,
+            data,
+            file_name,
+            final_folder_id
+        )
+    except HttpError as e:
+        if e.resp.status != 404:
+            raise
 
+    # A cached folder was deleted or moved; resolve the path again and retry once
+    invalidate_drive_path(root_folder_id, client_name)
     validate_shared_drive_access(service, root_folder_id)
-
     final_folder_id = ensure_drive_path(
         service,
         root_folder_id,
@@ -142,10 +213,9 @@ def upload_to_drive(
         use_case_name
     )
 
-    # Upload file
     return upload_file_to_drive(
         service,
-        file_path,
+        data,
         file_name,
         final_folder_id
-    )
\ No newline at end of file
+    )
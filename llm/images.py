@@ -0,0 +1,94 @@
+import io
+import math
+import os
+
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "2048"))
+IMAGE_JPEG_QUALITY = int(os.getenv("IMAGE_JPEG_QUALITY", "90"))
+# "low", "high" or "auto" (low when the image fits a single 512px tile)
+IMAGE_DETAIL = os.getenv("IMAGE_DETAIL", "auto")
+
+MIME_TYPES = {
+    "PNG": "image/png",
+    "JPEG": "image/jpeg",
+    "WEBP": "image/webp",
+    "GIF": "image/gif",
+}
+
+
+def estimate_vision_tokens(width, height, detail):
+    # OpenAI's published tiling rule for image inputs
+    if detail == "low":
+        return 85
+
+    scale = min(1.0, 2048 / max(width, height))
+    width, height = width * scale, height * scale
+    scale = min(1.0, 768 / min(width, height))
+    width, height = width * scale, height * scale
+
+    return 85 + 170 * math.ceil(width / 512) * math.ceil(height / 512)
+
+
+def _encode(img, fmt):
+    out = io.BytesIO()
+    if fmt == "JPEG":
+        img.convert("RGB").save(out, "JPEG", quality=IMAGE_JPEG_QUALITY, optimize=True)
+    else:
+        img.save(out, "PNG", optimize=True)
+    return out.getvalue()
+
+
+# -----------------------------
+# Downscale and recompress before vision analysis
+# -----------------------------
+def prepare_image(image_bytes):
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        img = Image.open(io.BytesIO(image_bytes))
+        img.load()
+    except (UnidentifiedImageError, OSError):
+        # Not something Pillow can read; send it untouched as before
+        return {
+            "data": image_bytes,
+            "mime_type": "image/png",
+            "detail": "high" if IMAGE_DETAIL == "auto" else IMAGE_DETAIL,
+            "original_bytes": len(image_bytes),
+            "bytes": len(image_bytes),
+            "original_tokens": None,
+            "tokens": None,
+        }
+
+    source_format = img.format
+    original_size = img.size
+
+    if max(img.size) > IMAGE_MAX_SIDE:
+        img.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), Image.Resampling.LANCZOS)
+
+    # Keep the original when it is already small and in a format the model accepts
+    candidates = []
+    if img.size == original_size and source_format in MIME_TYPES:
+        candidates.append((image_bytes, MIME_TYPES[source_format]))
+
+    if img.mode not in ("RGB", "L", "P"):
+        img = img.convert("RGBA")
+    candidates.append((_encode(img, "PNG"), "image/png"))
+
+    # JPEG has no alpha channel
+    if img.mode != "RGBA" and "transparency" not in img.info:
+        candidates.append((_encode(img, "JPEG"), "image/jpeg"))
+
+    data, mime_type = min(candidates, key=lambda c: len(c[0]))
+
+    detail = IMAGE_DETAIL
+    if detail == "auto":
+        detail = "low" if max(img.size) <= 512 else "high"
+
+    return {
+        "data": data,
+        "mime_type": mime_type,
+        "detail": detail,
+        "original_bytes": len(image_bytes),
+        "bytes": len(data),
+        "original_tokens": estimate_vision_tokens(*original_size, "high"),
+        "tokens": estimate_vision_tokens(*img.size, detail),
+    }
@@ -0,0 +1,210 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from llm.llm import run_llm_pipeline
+import json
+import os
+import sqlite3
+import threading
+import traceback
+import uuid
+
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", "jobs.db")
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+
+_lock = threading.Lock()
+_conn = None
+_executor = None
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+# -----------------------------
+# Local job store (SQLite)
+# -----------------------------
+def _db():
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(JOB_STORE_PATH, check_same_thread=False)
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                stage TEXT,
+                stages TEXT NOT NULL,
+                request TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL,
+                worker INTEGER
+            )
+            """
+        )
+        # Stores created before jobs were claimed by a worker process
+        columns = [row[1] for row in _conn.execute("PRAGMA table_info(jobs)")]
+        if "worker" not in columns:
+            _conn.execute("ALTER TABLE jobs ADD COLUMN worker INTEGER")
+        _conn.commit()
+    return _conn
+
+
+def _update(job_id, **fields):
+    fields["updated_at"] = _now()
+    columns = ", ".join(f"{k} = ?" for k in fields)
+    with _lock:
+        db = _db()
+        db.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+        db.commit()
+
+
+def get_job(job_id):
+    with _lock:
+        row = _db().execute(
+            "SELECT id, status, stage, stages, result, error, created_at, updated_at "
+            "FROM jobs WHERE id = ?",
+            (job_id,)
+        ).fetchone()
+
+    if row is None:
+        return None
+
+    return {
+        "job_id": row[0],
+        "status": row[1],
+        "stage": row[2],
+        "stages": json.loads(row[3]),
+        "result": json.loads(row[4]) if row[4] else None,
+        "error": row[5],
+        "created_at": row[6],
+        "updated_at": row[7],
+    }
+
+
+# -----------------------------
+# Worker pool
+# -----------------------------
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+    return _executor
+
+
+def _record_stage(job_id, stages, stage):
+    now = _now()
+    if stages:
+        stages[-1]["finished_at"] = now
+    stages.append({"name": stage, "started_at": now, "finished_at": None})
+    _update(job_id, stage=stage, stages=json.dumps(stages))
+
+
+def _claim(job_id):
+    # Several server processes share the store; only one of them may run a job
+    with _lock:
+        db = _db()
+        claimed = db.execute(
+            "UPDATE jobs SET status = 'running', worker = ?, stage = NULL, stages = '[]', updated_at = ? "
+            "WHERE id = ? AND status = 'queued'",
+            (os.getpid(), _now(), job_id)
+        ).rowcount
+        db.commit()
+        if not claimed:
+            return None
+        return db.execute("SELECT request FROM jobs WHERE id = ?", (job_id,)).fetchone()[0]
+
+
+def _run_job(job_id):
+    request = _claim(job_id)
+    if request is None:
+        print(f"Job {job_id} was already claimed by another worker")
+        return
+    request = json.loads(request)
+
+    stages = []
+
+    try:
+        result = run_llm_pipeline(
+            **request,
+            progress=lambda stage: _record_stage(job_id, stages, stage)
+        )
+    except Exception as e:
+        traceback.print_exc()
+        if stages:
+            stages[-1]["finished_at"] = _now()
+        _update(job_id, status="failed", stages=json.dumps(stages), error=str(e))
+        return
+
+    if stages:
+        stages[-1]["finished_at"] = _now()
+    _update(job_id, status="succeeded", stage=None, stages=json.dumps(stages), result=json.dumps(result))
+
+
+def submit_job(request):
+    job_id = uuid.uuid4().hex
+    now = _now()
+
+    with _lock:
+        db = _db()
+        db.execute(
+            "INSERT INTO jobs (id, status, stages, request, created_at, updated_at) "
+            "VALUES (?, 'queued', '[]', ?, ?, ?)",
+            (job_id, json.dumps(request), now, now)
+        )
+        db.commit()
+
+    _get_executor().submit(_run_job, job_id)
+    return job_id
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def resume_jobs():
+    """Start again the jobs left queued, or running in a process that has since stopped.
+
+    Jobs still running in another live worker (``uvicorn --workers N``) are
+    left alone; queued ones may be submitted by several workers, but
+    ``_claim`` lets only one of them run each job.
+    """
+    with _lock:
+        rows = _db().execute(
+            "SELECT id, status, worker FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+
+    resumed = 0
+    for job_id, status, worker in rows:
+        if status == "running":
+            # Nothing runs in this process yet, so its own pid (reused, e.g. pid 1 in a container) is stale
+            if worker is not None and worker != os.getpid() and _process_alive(worker):
+                continue
+            with _lock:
+                db = _db()
+                requeued = db.execute(
+                    "UPDATE jobs SET status = 'queued', updated_at = ? "
+                    "WHERE id = ? AND status = 'running' AND worker IS ?",
+                    (_now(), job_id, worker)
+                ).rowcount
+                db.commit()
+            if not requeued:
+                continue
+        _get_executor().submit(_run_job, job_id)
+        resumed += 1
+
+    return resumed
+
+
+def shutdown_jobs():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,136 +1,691 @@
 from dotenv import load_dotenv
-from openai import AzureOpenAI
-from excel.excel_writer_combined import generate_cost_excel_combined
-from llm.gdrive import upload_to_drive
-from llm.adls import upload_to_blob_with_sas
+from llm.delivery import upload_to_destinations_async, run_blocking_io
+from llm.streaming import SectionParser, TOKEN_EVENT_EVERY
+from llm.metrics import timed, record_usage, pipeline_mode, PIPELINE_RUNS, IMAGE_BYTES, IMAGE_TOKENS
+from llm.images import prepare_image, IMAGE_MAX_SIDE, IMAGE_JPEG_QUALITY, IMAGE_DETAIL
+from llm.fetch import is_remote, read_image_bytes, read_document_bytes
+from llm.schema import (
+    COST_JSON_SCHEMA, SECTION_SCHEMAS, repair_sections, response_format, section_schema, text_format
+)
+from llm.resilience import async_resilient_call, LLM_HEDGE_AFTER_SECONDS
+from llm.cache import DiskCache, cache_key
+from llm.estimates import save_estimate, load_estimate
 import os
+import io
+import asyncio
 import base64
+import hashlib
 import json
 import re
+import weakref
 load_dotenv()
 
 OPEN_AI_KEY = os.getenv('OPEN_AI_API_KEY')
 OPEN_AI_MODEL = os.getenv('OPEN_AI_MODEL')
 OPEN_AI_ENDPOINT = os.getenv('OPEN_AI_ENDPOINT')
 
-api_version = "2025-03-01-preview"  
+api_version = "2025-03-01-preview"
 
 
-client = AzureOpenAI(
-    api_key=OPEN_AI_KEY,
-    azure_endpoint=OPEN_AI_ENDPOINT,
-    api_version=api_version
-)
+# Heavy SDKs (openai, openpyxl, numpy, Pillow, Azure and Google clients) are
+# imported on first use, or by llm.warmup, so importing this module stays cheap.
+# An async client's connections belong to the event loop that opened them, so there is
+# one client per loop: the API server's, or the short-lived loop of a blocking call.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        from openai import AsyncAzureOpenAI
+
+        client = _clients[loop] = AsyncAzureOpenAI(
+            api_key=OPEN_AI_KEY,
+            azure_endpoint=OPEN_AI_ENDPOINT,
+            api_version=api_version,
+            # Retries are handled by llm.resilience so backoff and the circuit breaker see every attempt
+            max_retries=0
+        )
+    return client
+
+
+async def _close_async_clients():
+    from llm.adls import close_async_blob_service
+
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.close()
+    await close_async_blob_service()
+
+
+# Bump to invalidate every memoized stage output after a pipeline change
+STAGE_CACHE_VERSION = "1"
+
+ARCHITECTURE_PROMPT_PATH = "llm/prompts/architecture_text.txt"
+COST_PROMPT_PATH = "llm/prompts/cost_estimation.txt"
+
+image_cache = DiskCache("analyze_image")
+architecture_cache = DiskCache("architecture_text")
+cost_json_cache = DiskCache("cost_json")
+
+IMAGE_PROMPT = "Describe this image."
+
+# Completion budget when a single cost JSON section is requested again
+SECTION_MAX_TOKENS = int(os.getenv("SECTION_MAX_TOKENS", "3000"))
+
+# three_call: describe, clean up, estimate. two_call: the image goes straight into the
+# clean-up prompt. fused: a single multimodal call returns the cost JSON.
+PIPELINE_MODES = ("three_call", "two_call", "fused")
+PIPELINE_MODE = os.getenv("PIPELINE_MODE", "three_call")
+
+# Let the model download http(s) images itself instead of inlining them
+IMAGE_URL_PASSTHROUGH = os.getenv("IMAGE_URL_PASSTHROUGH", "true").lower() == "true"
 
 def load_prompt(path: str) -> str:
     with open(path, "r") as f:
         return f.read()
 
 
-def analyze_image(path):
-    b64 = base64.b64encode(open(path, "rb").read()).decode("utf-8")
+def _stage_key(stage, prompt_template, *inputs):
+    return cache_key(STAGE_CACHE_VERSION, stage, OPEN_AI_MODEL, prompt_template, *inputs)
+
 
-    response = client.responses.create(
+def _vision_request(image_content, prompt, max_output_tokens=2048, text_format=None):
+    request = dict(
         model=OPEN_AI_MODEL,
         input=[
             {
                 "role": "user",
                 "content": [
-                    {"type": "input_text", "text": "Describe this image."},
-                    {"type": "input_image", "image_url": f"data:image/png;base64,{b64}"}
+                    {"type": "input_text", "text": prompt},
+                    {"type": "input_image", **image_content}
                 ]
             }
         ],
-        max_output_tokens=2048
+        max_output_tokens=max_output_tokens
+    )
+    if text_format:
+        request["text"] = {"format": text_format}
+    return request
+
+
+def _url_image_key(stage, prompt, url):
+    return cache_key(STAGE_CACHE_VERSION, stage, "url", url, OPEN_AI_MODEL, prompt, IMAGE_DETAIL)
+
+
+def _inline_image_key(stage, prompt, image_bytes):
+    # Preprocessing settings change what the model sees, so they are part of the key
+    return cache_key(
+        STAGE_CACHE_VERSION, stage, hashlib.sha256(image_bytes).hexdigest(), OPEN_AI_MODEL, prompt,
+        f"{IMAGE_MAX_SIDE}:{IMAGE_JPEG_QUALITY}:{IMAGE_DETAIL}"
+    )
+
+
+def _inline_image(image_bytes):
+    # Downscale/re-encode and wrap as a data URI; CPU-bound
+    image = prepare_image(image_bytes)
+    print(
+        f"Image preprocessed: {image['original_bytes']} -> {image['bytes']} bytes, "
+        f"~{image['original_tokens']} -> ~{image['tokens']} vision tokens "
+        f"({image['mime_type']}, detail={image['detail']})"
     )
+    IMAGE_BYTES.labels("original").inc(image["original_bytes"])
+    IMAGE_BYTES.labels("sent").inc(image["bytes"])
+    if image["tokens"] is not None:
+        IMAGE_TOKENS.labels("original").inc(image["original_tokens"])
+        IMAGE_TOKENS.labels("sent").inc(image["tokens"])
+
+    b64 = base64.b64encode(image["data"]).decode("utf-8")
+    return {"image_url": f"data:{image['mime_type']};base64,{b64}", "detail": image["detail"]}
+
+
+# -----------------------------
+# Model calls
+# Every stage is a coroutine. Cache reads and writes, prompt files and CPU-bound
+# work run in worker threads, so an event loop is never stalled; the blocking
+# entry points at the bottom of this module run the same coroutines with asyncio.run.
+# -----------------------------
+def _read(fn, uri):
+    # Downloads wait on the network: they go to the I/O pool so that they never hold up the
+    # short steps (cache lookups, prompt reads) queued on the default executor
+    return run_blocking_io(fn, uri) if is_remote(uri) else asyncio.to_thread(fn, uri)
+
 
+def _respond(stage, request):
+    return async_resilient_call(stage, OPEN_AI_MODEL, lambda: get_async_client().responses.create(**request))
+
+
+def _complete(stage, request):
+    return async_resilient_call(stage, OPEN_AI_MODEL, lambda: get_async_client().chat.completions.create(**request))
+
+
+async def _describe_image(image_content, prompt=IMAGE_PROMPT, stage="analyze_image", **options):
+    response = await _respond(stage, _vision_request(image_content, prompt, **options))
+
+    record_usage(stage, response.usage)
     return response.output_text
 
-def architecture_text(architecture_raw_text):
-    
-    prompt_template = load_prompt("llm/prompts/architecture_text.txt")
+
+async def _vision_call(path, prompt, stage, cache, refresh=False, finish=None, **options):
+    """Run ``prompt`` against the image at ``path``, memoized on the image and the prompt.
+
+    ``finish(output, image_content)``, if given, is a coroutine function that
+    post-processes the model output before it is cached; it gets the image as
+    sent, for follow-up requests.
+    """
+    async def done(output, image_content):
+        return await finish(output, image_content) if finish else output
+
+    if is_remote(path) and IMAGE_URL_PASSTHROUGH:
+        from openai import BadRequestError
+
+        key = _url_image_key(stage, prompt, path)
+        cached = None if refresh else await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            print(f"{stage} served from cache")
+            return cached
+
+        image_content = {"image_url": path, "detail": IMAGE_DETAIL}
+        try:
+            output = await done(await _describe_image(image_content, prompt, stage, **options), image_content)
+        except BadRequestError as e:
+            # The service could not download it (private URL, unsupported host...)
+            print(f"Image URL passthrough rejected, sending inline instead: {e}")
+        else:
+            await asyncio.to_thread(cache.set, key, output)
+            return output
+
+    image_bytes = await _read(read_image_bytes, path)
+
+    key = await asyncio.to_thread(_inline_image_key, stage, prompt, image_bytes)
+    cached = None if refresh else await asyncio.to_thread(cache.get, key)
+    if cached is not None:
+        print(f"{stage} served from cache")
+        return cached
+
+    image_content = await asyncio.to_thread(_inline_image, image_bytes)
+    output = await done(await _describe_image(image_content, prompt, stage, **options), image_content)
+
+    await asyncio.to_thread(cache.set, key, output)
+    return output
+
+
+async def _analyze_image(path, refresh=False):
+    return await _vision_call(path, IMAGE_PROMPT, "analyze_image", image_cache, refresh)
+
+
+async def _analyze_images(paths, refresh=False):
+    # Latency is that of the slowest diagram
+    return await asyncio.gather(*(_analyze_image(path, refresh) for path in paths))
+
+
+# -----------------------------
+# Several diagrams per request
+# -----------------------------
+def image_list(image_uri):
+    """``image_uri`` may be one URI or a list of them; always return a list."""
+    if not image_uri:
+        return []
+    if isinstance(image_uri, str):
+        return [image_uri]
+    return list(image_uri)
+
+
+def merge_descriptions(descriptions):
+    if len(descriptions) == 1:
+        return descriptions[0]
+    return "\n\n".join(
+        f"Diagram {index} of {len(descriptions)}:\n{description}"
+        for index, description in enumerate(descriptions, 1)
+    )
+
+
+# -----------------------------
+# Fewer round trips: the image goes straight into the later prompts
+# -----------------------------
+def _architecture_raw_text(image_description=None, document_text=None, requirements=None):
+    # Text from an uploaded solution document and the user's own requirements sit next to
+    # (or replace) the image description
+    parts = [image_description]
+    if document_text:
+        parts.append(f"Solution document:\n{document_text}")
+    if requirements:
+        parts.append(f"User requirements:\n{requirements}")
+    return "\n\n".join(part for part in parts if part)
+
+
+def _architecture_prompt_for_image(document_text=None, requirements=None):
+    return load_prompt(ARCHITECTURE_PROMPT_PATH).replace(
+        "{{architecture_raw_text}}",
+        _architecture_raw_text("(Interpret the attached architecture diagram directly.)", document_text, requirements)
+    )
+
+
+async def _architecture_from_image(path, refresh=False, document_text=None, requirements=None):
+    # Two-call mode: description and cleanup in one multimodal request
+    prompt = await asyncio.to_thread(_architecture_prompt_for_image, document_text, requirements)
+    return await _vision_call(
+        path, prompt, "architecture_from_image", architecture_cache, refresh, max_output_tokens=2000
+    )
+
+
+def fused_cost_prompt(document_text=None, requirements=None):
+    interpretation = (
+        "Interpret the attached architecture diagram yourself, applying the rules below. "
+        "Use that interpretation only as the basis for your estimate; do not output it.\n\n"
+        + _architecture_prompt_for_image(document_text, requirements)
+    )
+    return load_prompt(COST_PROMPT_PATH).replace("{{solution}}", interpretation)
+
+
+FUSED_OPTIONS = {
+    "max_output_tokens": 6000,
+    "text_format": text_format("cost_estimate", COST_JSON_SCHEMA),
+}
+
+
+async def _cost_json_from_image(path, refresh=False, document_text=None, requirements=None):
+    # Fused mode: image, interpretation rules and estimation rules in one request.
+    # The prompt refers to the attached diagram, so repairs send the image again.
+    prompt = await asyncio.to_thread(fused_cost_prompt, document_text, requirements)
+    return await _vision_call(
+        path, prompt, "cost_json_fused", cost_json_cache, refresh,
+        finish=lambda output, image_content: _complete_sections(output, prompt, image_content=image_content),
+        **FUSED_OPTIONS
+    )
+
+
+def _architecture_request(architecture_raw_text):
+    prompt_template = load_prompt(ARCHITECTURE_PROMPT_PATH)
     prompt = prompt_template.replace("{{architecture_raw_text}}", architecture_raw_text)
 
-    response = client.chat.completions.create(
+    key = _stage_key("architecture_text", prompt_template, architecture_raw_text)
+    request = dict(
         model=OPEN_AI_MODEL,
         messages=[{"role": "user", "content": prompt}],
         max_completion_tokens=2000,
     )
+    return key, request
+
+
+async def _architecture_text(architecture_raw_text, refresh=False):
+    key, request = await asyncio.to_thread(_architecture_request, architecture_raw_text)
+    cached = None if refresh else await asyncio.to_thread(architecture_cache.get, key)
+    if cached is not None:
+        print("Architecture text served from cache")
+        return cached
+
+    response = await _complete("architecture_text", request)
+
+    record_usage("architecture_text", response.usage)
+    output = response.choices[0].message.content
+    await asyncio.to_thread(architecture_cache.set, key, output)
+    return output
+
+
+def _cost_json_key(final_input):
+    return _stage_key("cost_json", load_prompt(COST_PROMPT_PATH), final_input)
+
+
+def _cost_json_request(final_input):
+    return dict(
+        model=OPEN_AI_MODEL,
+        messages=[
+            {"role": "user", "content": final_input}
+        ],
+        max_completion_tokens=6000,
+        response_format=response_format("cost_estimate", COST_JSON_SCHEMA),
+        stream=True,
+        stream_options={"include_usage": True},
+    )
 
-    return response.choices[0].message.content
 
+def _emit_sections(events, parser, delta):
+    # Sections are emitted as soon as they parse, while the rest is still streaming
+    if events:
+        for name, value in parser.feed(delta):
+            events({"event": "section", "name": name, "data": value})
 
-def generate_cost_json_azure(final_prompt, solution):
-    
+
+async def _generate_cost_json(final_prompt, solution, refresh=False, events=None):
     final_input = final_prompt.replace("{{solution}}", solution)
 
-    try:
-        response = client.chat.completions.create(
-            model=OPEN_AI_MODEL,
-            messages=[
-                {"role": "user", "content": final_input}
-            ],
-            max_completion_tokens=6000,
+    key = await asyncio.to_thread(_cost_json_key, final_input)
+    cached = None if refresh else await asyncio.to_thread(cost_json_cache.get, key)
+    if cached is not None:
+        print("Cost JSON served from cache")
+        _emit_sections(events, SectionParser(), cached)
+        return cached
+
+    attempts = 0
+
+    async def stream_completion():
+        nonlocal attempts
+        attempts += 1
+        if attempts > 1 and events:
+            # A retried stream starts over; clients drop the sections and counts of the failed attempt
+            events({"event": "retry", "stage": "cost_json", "attempt": attempts})
+
+        parser = SectionParser()
+        parts = []
+        async for chunk in await get_async_client().chat.completions.create(**_cost_json_request(final_input)):
+            if chunk.usage:
+                record_usage("cost_json", chunk.usage)
+            if chunk.usage and events:
+                events({
+                    "event": "tokens",
+                    "prompt_tokens": chunk.usage.prompt_tokens,
+                    "completion_tokens": chunk.usage.completion_tokens,
+                    "final": True
+                })
+
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+
+            delta = chunk.choices[0].delta.content
+            parts.append(delta)
+            _emit_sections(events, parser, delta)
+
+            if events and len(parts) % TOKEN_EVENT_EVERY == 0:
+                # Progress only: chunks, not tokens; the final event carries the real usage
+                events({"event": "tokens", "chunks": len(parts), "final": False})
+        return "".join(parts)
+
+    # A hedged duplicate would interleave its deltas with the first stream's events
+    output = await async_resilient_call(
+        "cost_json", OPEN_AI_MODEL, stream_completion, hedge_after=0 if events else LLM_HEDGE_AFTER_SECONDS
+    )
+
+    output = await _complete_sections(output, final_input, events)
+    await asyncio.to_thread(cost_json_cache.set, key, output)
+    return output
+
+
+async def _complete_sections(output, final_input, events=None, image_content=None):
+    # Truncated or invalid sections are requested again on their own, all at once
+    sections, missing = repair_sections(output)
+    for name in missing:
+        print(f"Cost JSON section '{name}' is missing or invalid; requesting it again")
+
+    repaired = await asyncio.gather(*(
+        _request_cost_section(final_input, name, sections, image_content) for name in missing
+    ))
+    for name, value in zip(missing, repaired):
+        sections[name] = value
+        if events:
+            events({"event": "section", "name": name, "data": value})
+
+    return json.dumps({name: sections[name] for name in SECTION_SCHEMAS})
+
+
+def _section_request(final_input, name, sections, image_content=None):
+    prompt = (
+        f"{final_input}\n\n"
+        f"These sections were already produced; stay consistent with them:\n"
+        f"{json.dumps(sections)}\n\n"
+        f'Return ONLY a JSON object with the single key "{name}".'
+    )
+
+    if image_content:
+        return _vision_request(
+            image_content, prompt, max_output_tokens=SECTION_MAX_TOKENS,
+            text_format=text_format(f"cost_estimate_{name}", section_schema(name))
         )
+    return dict(
+        model=OPEN_AI_MODEL,
+        messages=[{"role": "user", "content": prompt}],
+        max_completion_tokens=SECTION_MAX_TOKENS,
+        response_format=response_format(f"cost_estimate_{name}", section_schema(name)),
+    )
 
+
+async def _request_cost_section(final_input, name, sections, image_content=None):
+    request = _section_request(final_input, name, sections, image_content)
+    if image_content:
+        response = await _respond("cost_json_repair", request)
+        output = response.output_text
+    else:
+        response = await _complete("cost_json_repair", request)
         output = response.choices[0].message.content
-        return output
-    
-    except Exception as e:
-        return f"LLM Error: {str(e)}"
-    
+
+    record_usage("cost_json_repair", response.usage)
+    return json.loads(output)[name]
+
 def safe_json_parse(text):
     cleaned = re.sub(r"```json|```", "", text).strip()
     return json.loads(cleaned)
 
 
-    
-def run_llm_pipeline(image_uri, client_name, use_case_name, markets):
-    print("Step 1: Analyzing architecture image...")
-    arch_diag = analyze_image(image_uri)
-    
-    print("Step 2: Cleaning architecture text...")
-    solution = architecture_text(arch_diag)
-    
-    prompt_template = load_prompt("llm/prompts/cost_estimation.txt")
+
+def _report(progress, stage, message, events=None):
+    print(message)
+    if progress:
+        progress(stage)
+    if events:
+        events({"event": "stage", "stage": stage, "message": message})
+
+
+# -----------------------------
+# Pipeline
+# -----------------------------
+async def run_llm_pipeline_async(image_uri, client_name, use_case_name, markets, progress=None, refresh=False,
+                                 events=None, mode=None, document_uri=None, document_text=None, requirements=None):
+    try:
+        result = await _estimate(
+            image_uri, client_name, use_case_name, markets, progress, refresh, events, mode or PIPELINE_MODE,
+            document_uri, document_text, requirements
+        )
+    except Exception:
+        PIPELINE_RUNS.labels("failed").inc()
+        raise
+
+    PIPELINE_RUNS.labels("success").inc()
+    print("Pipeline completed successfully")
+    return result
+
+
+async def _cost_json_for_mode(images, mode, progress, refresh, events, document_text=None, requirements=None):
+    image_uri = images[0] if images else None
+    if not images:
+        # A document on its own goes straight to the clean-up step, whatever the mode
+        _report(progress, "architecture_text", "Step 2: Cleaning architecture text...", events)
+        with timed("architecture_text"):
+            solution = await _architecture_text(
+                _architecture_raw_text(None, document_text, requirements), refresh=refresh
+            )
+    elif mode == "fused":
+        _report(progress, "cost_json", "Step 1-3: Generating cost JSON from the image...", events)
+        with timed("cost_json_fused"):
+            final_out = await _cost_json_from_image(
+                image_uri, refresh=refresh, document_text=document_text, requirements=requirements
+            )
+        # Nothing streams in this mode, so every section arrives at once
+        if events:
+            for name, value in json.loads(final_out).items():
+                events({"event": "section", "name": name, "data": value})
+        return final_out
+    elif mode == "two_call":
+        _report(progress, "architecture_text", "Step 1-2: Interpreting architecture image...", events)
+        with timed("architecture_from_image"):
+            solution = await _architecture_from_image(
+                image_uri, refresh=refresh, document_text=document_text, requirements=requirements
+            )
+    else:
+        _report(progress, "analyze_image", "Step 1: Analyzing architecture image...", events)
+        with timed("analyze_image"):
+            arch_diag = merge_descriptions(await _analyze_images(images, refresh=refresh))
+
+        _report(progress, "architecture_text", "Step 2: Cleaning architecture text...", events)
+        with timed("architecture_text"):
+            solution = await _architecture_text(
+                _architecture_raw_text(arch_diag, document_text, requirements), refresh=refresh
+            )
+
+    prompt_template = await asyncio.to_thread(load_prompt, COST_PROMPT_PATH)
     final_prompt = prompt_template.replace("{{solution}}",solution)
-    
-    print("Step 3: Generating cost JSON...")
-    final_out = generate_cost_json_azure(final_prompt, solution)
 
-    print("Step 4: Parsing JSON output...")
-    cost_json = safe_json_parse(final_out)
+    _report(progress, "cost_json", "Step 3: Generating cost JSON...", events)
+    with timed("cost_json"):
+        return await _generate_cost_json(final_prompt, solution, refresh=refresh, events=events)
 
-    print("Step 5: Creating Excel file...")
+
+async def _estimate(image_uri, client_name, use_case_name, markets, progress, refresh, events, mode,
+                    document_uri=None, document_text=None, requirements=None):
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode '{mode}'; expected one of {', '.join(PIPELINE_MODES)}")
+    images = image_list(image_uri)
+    if not (images or document_uri or document_text or requirements):
+        raise ValueError("An architecture image, a solution document or requirements are required")
+    if len(images) > 1 and mode != "three_call":
+        # Two-call and fused modes send a single image; several are described one by one
+        print(f"{len(images)} diagrams: using three_call mode instead of {mode}")
+        mode = "three_call"
+
+    if document_uri:
+        _report(progress, "extract_document", "Step 0: Extracting solution document text...", events)
+        with timed("extract_document"):
+            from llm.pdf import extract_pdf_text
+
+            data = await _read(read_document_bytes, document_uri)
+            extracted = await asyncio.to_thread(extract_pdf_text, data)
+            document_text = "\n\n".join(part for part in (document_text, extracted) if part)
+
+    with pipeline_mode(mode):
+        final_out = await _cost_json_for_mode(images, mode, progress, refresh, events, document_text, requirements)
+
+    _report(progress, "parse_json", "Step 4: Parsing JSON output...", events)
+    with timed("parse_json"):
+        from llm.cost_engine import apply_cost_engine
+
+        cost_json = await asyncio.to_thread(lambda: apply_cost_engine(safe_json_parse(final_out)))
+    await asyncio.to_thread(save_estimate, client_name, use_case_name, cost_json, image_uri)
+
+    result = await deliver_workbook_async(cost_json, client_name, use_case_name, image_uri, markets, progress, events)
+    return {**result, "mode": mode}
+
+
+def _embeddable(image_uri):
+    # None (not dropped) for a diagram that cannot be fetched: the workbook shows a placeholder
+    # sheet in its place, so the other diagrams keep their numbers
+    if not is_remote(image_uri):
+        return image_uri
+    try:
+        return io.BytesIO(read_image_bytes(image_uri))
+    except Exception as e:
+        print(f"Could not fetch architecture image for Excel: {e}")
+        return None
+
+
+def _upload_drive(workbook, client_name, use_case_name, file_name):
+    with timed("drive_upload"):
+        from llm.gdrive import upload_to_drive
+
+        return upload_to_drive(
+            data=workbook,
+            file_name=file_name,
+            root_folder_id=os.getenv("DRIVE_FOLDER_ID"),
+            client_name=client_name,
+            use_case_name=use_case_name
+        )["view_link"]
+
+
+async def deliver_workbook_async(cost_json, client_name, use_case_name, image_uri, markets, progress=None,
+                                 events=None, scenarios=None):
+    _report(progress, "excel", "Step 5: Creating Excel file...", events)
     output_excel = client_name + '_' + "consumption.xlsx"
 
-    generate_cost_excel_combined(cost_json, output_excel, client_name, use_case_name, image_uri, markets)
-    print(f"Excel generated: {output_excel}")
+    # Remote diagrams are embedded from the bytes fetched (once) for the pipeline
+    images = await asyncio.gather(*(_read(_embeddable, image) for image in image_list(image_uri)))
 
-    print("Step 6: Uploading file to Azure Blob Storage with SAS...")
-    sas_url = upload_to_blob_with_sas(output_excel, client_name, use_case_name, output_excel)
+    # Built per request in memory so concurrent runs never share a file on disk
+    buffer = io.BytesIO()
+    with timed("excel"):
+        from excel.excel_writer_combined import generate_cost_excel_combined
 
-    if not sas_url:
-        raise RuntimeError("Azure upload failed – SAS URL not generated")
+        await asyncio.to_thread(
+            generate_cost_excel_combined, cost_json, buffer, client_name, use_case_name, list(images), markets,
+            scenarios
+        )
+    workbook = buffer.getvalue()
+    print(f"Excel generated: {output_excel} ({len(workbook)} bytes)")
 
-    print("Azure SAS URL:")
-    print(sas_url)
+    _report(progress, "upload", "Step 6: Uploading file to Azure Blob Storage and Google Drive...", events)
 
-    print("Step 8: Uploading file to Google Drive...")
-    drive_result = upload_to_drive(
-        file_path=output_excel,
-        file_name=output_excel,
-        root_folder_id=os.getenv("DRIVE_FOLDER_ID"),
-        client_name=client_name,
-        use_case_name=use_case_name
-    )
+    async def upload_blob():
+        with timed("blob_upload"):
+            from llm.adls import upload_to_blob_with_sas_async
 
-    print("Google Drive upload successful")
-    print("Drive file link:", drive_result["view_link"])
+            return await upload_to_blob_with_sas_async(workbook, client_name, use_case_name, output_excel)
 
-    print("Pipeline completed successfully")
+    async def upload_drive():
+        # The Google client is synchronous; the I/O pool's long-lived threads keep their Drive services
+        return await run_blocking_io(_upload_drive, workbook, client_name, use_case_name, output_excel)
+
+    uploads = await upload_to_destinations_async({
+        "azure_blob": upload_blob,
+        "google_drive": upload_drive,
+    })
+
+    if all(u["status"] == "failed" for u in uploads.values()):
+        raise RuntimeError(
+            "All uploads failed: " + "; ".join(f"{name}: {u['error']}" for name, u in uploads.items())
+        )
 
     return {
-        "azure_sas_url": sas_url,
-        "drive_link": drive_result["view_link"]
-    }
\ No newline at end of file
+        "azure_sas_url": uploads["azure_blob"]["link"],
+        "drive_link": uploads["google_drive"]["link"],
+        "uploads": uploads
+    }
+
+
+# -----------------------------
+# Blocking entry points (jobs, batches, streams, the UI)
+# Called from threads with no running event loop: each call runs on its own loop.
+# -----------------------------
+def _run_sync(coro):
+    async def run():
+        try:
+            return await coro
+        finally:
+            await _close_async_clients()
+
+    return asyncio.run(run())
+
+
+def analyze_image(path, refresh=False):
+    return _run_sync(_analyze_image(path, refresh))
+
+
+def architecture_text(architecture_raw_text, refresh=False):
+    return _run_sync(_architecture_text(architecture_raw_text, refresh))
+
+
+def generate_cost_json_azure(final_prompt, solution, refresh=False, events=None):
+    return _run_sync(_generate_cost_json(final_prompt, solution, refresh, events))
+
+
+def run_llm_pipeline(image_uri, client_name, use_case_name, markets, progress=None, refresh=False, events=None,
+                     mode=None, document_uri=None, document_text=None, requirements=None):
+    return _run_sync(run_llm_pipeline_async(
+        image_uri, client_name, use_case_name, markets, progress, refresh, events, mode,
+        document_uri, document_text, requirements
+    ))
+
+
+def deliver_workbook(cost_json, client_name, use_case_name, image_uri, markets, progress=None, events=None,
+                     scenarios=None):
+    return _run_sync(deliver_workbook_async(
+        cost_json, client_name, use_case_name, image_uri, markets, progress, events, scenarios
+    ))
+
+
+def regenerate_workbook(client_name, use_case_name, markets, progress=None, events=None, scenarios=None):
+    estimate = load_estimate(client_name, use_case_name)
+    if estimate is None:
+        raise LookupError(f"No stored estimate for client '{client_name}' and use case '{use_case_name}'")
+
+    return deliver_workbook(
+        estimate["cost_json"], client_name, use_case_name, estimate["image_uri"], markets, progress, events,
+        scenarios
+    )
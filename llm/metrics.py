@@ -0,0 +1,118 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from prometheus_client import Counter, Histogram
+import os
+import time
+
+# USD per 1K tokens, used to turn recorded usage into spend
+PROMPT_COST_PER_1K = float(os.getenv("OPEN_AI_PROMPT_COST_PER_1K", "0"))
+COMPLETION_COST_PER_1K = float(os.getenv("OPEN_AI_COMPLETION_COST_PER_1K", "0"))
+
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds",
+    "Wall time of each pipeline stage",
+    ["stage"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300),
+)
+STAGE_FAILURES = Counter(
+    "pipeline_stage_failures_total",
+    "Pipeline stages that raised",
+    ["stage"],
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens reported in OpenAI usage",
+    ["stage", "kind"],
+)
+LLM_COST = Counter(
+    "llm_cost_usd_total",
+    "Estimated OpenAI spend from recorded token usage",
+    ["stage"],
+)
+IMAGE_BYTES = Counter(
+    "image_bytes_total",
+    "Architecture image bytes before and after preprocessing",
+    ["phase"],
+)
+IMAGE_TOKENS = Counter(
+    "image_vision_tokens_total",
+    "Estimated vision tokens before and after preprocessing",
+    ["phase"],
+)
+LLM_RETRIES = Counter(
+    "llm_retries_total",
+    "Azure OpenAI calls retried after a transient error",
+    ["stage"],
+)
+LLM_HEDGES = Counter(
+    "llm_hedged_requests_total",
+    "Duplicate Azure OpenAI requests sent after the hedging threshold",
+    ["stage"],
+)
+CIRCUIT_TRIPS = Counter(
+    "llm_circuit_trips_total",
+    "Times the circuit breaker opened for a deployment",
+    ["deployment"],
+)
+PIPELINE_RUNS = Counter(
+    "pipeline_runs_total",
+    "Completed pipeline runs",
+    ["status"],
+)
+# Per pipeline mode, to compare the cost of fewer, larger model calls
+MODE_LLM_SECONDS = Histogram(
+    "pipeline_mode_llm_seconds",
+    "Wall time from the image to the cost JSON, per pipeline mode",
+    ["mode"],
+    buckets=(1, 2.5, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300),
+)
+MODE_TOKENS = Counter(
+    "pipeline_mode_tokens_total",
+    "Tokens reported in OpenAI usage, per pipeline mode",
+    ["mode", "kind"],
+)
+
+_mode = ContextVar("pipeline_mode", default=None)
+
+
+@contextmanager
+def pipeline_mode(mode):
+    # Usage recorded inside the block is also attributed to ``mode``
+    token = _mode.set(mode)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        MODE_LLM_SECONDS.labels(mode).observe(time.perf_counter() - start)
+        _mode.reset(token)
+
+
+@contextmanager
+def timed(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_FAILURES.labels(stage).inc()
+        raise
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def record_usage(stage, usage):
+    if usage is None:
+        return
+
+    # Chat completions report prompt/completion tokens, the Responses API input/output
+    prompt = getattr(usage, "prompt_tokens", None) or getattr(usage, "input_tokens", None) or 0
+    completion = getattr(usage, "completion_tokens", None) or getattr(usage, "output_tokens", None) or 0
+
+    LLM_TOKENS.labels(stage, "prompt").inc(prompt)
+    LLM_TOKENS.labels(stage, "completion").inc(completion)
+    mode = _mode.get()
+    if mode:
+        MODE_TOKENS.labels(mode, "prompt").inc(prompt)
+        MODE_TOKENS.labels(mode, "completion").inc(completion)
+    LLM_COST.labels(stage).inc(
+        prompt / 1000 * PROMPT_COST_PER_1K + completion / 1000 * COMPLETION_COST_PER_1K
+    )
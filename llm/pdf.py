@@ -0,0 +1,67 @@
+from concurrent.futures import ProcessPoolExecutor
+from llm.cache import DiskCache, cache_key
+import hashlib
+import io
+import multiprocessing
+import os
+import threading
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Below this many pages, starting worker processes costs more than it saves
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+
+pdf_text_cache = DiskCache("pdf_text")
+
+_lock = threading.Lock()
+_pool = None
+
+
+def get_pdf_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            # Forking a process with this many threads (server, pools, SQLite) can copy a held lock
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+def _reader(data):
+    # PyPDF2 is only needed when a document is actually uploaded
+    from PyPDF2 import PdfReader
+    return PdfReader(io.BytesIO(data))
+
+
+def _extract_pages(data, start, stop):
+    # Runs in a worker process; each worker parses its own copy of the document
+    reader = _reader(data)
+    return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def _page_ranges(page_count, chunks):
+    size = -(-page_count // chunks)
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extract_pdf_text(data):
+    """Return the text of a PDF given as bytes, cached by content hash.
+
+    Large documents are split into page ranges extracted in parallel by a
+    process pool, since PyPDF2 text extraction is pure-Python and CPU bound.
+    """
+    key = cache_key("pdf_text", hashlib.sha256(data).hexdigest())
+    cached = pdf_text_cache.get(key)
+    if cached is not None:
+        return cached
+
+    page_count = len(_reader(data).pages)
+    if page_count < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS < 2:
+        pages = _extract_pages(data, 0, page_count)
+    else:
+        ranges = _page_ranges(page_count, PDF_WORKERS * 2)
+        pool = get_pdf_pool()
+        futures = [pool.submit(_extract_pages, data, start, stop) for start, stop in ranges]
+        pages = [page for future in futures for page in future.result()]
+
+    text = "\n".join(pages)
+    pdf_text_cache.set(key, text)
+    return text
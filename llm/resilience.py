@@ -0,0 +1,234 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from llm.metrics import LLM_RETRIES, LLM_HEDGES, CIRCUIT_TRIPS
+import asyncio
+import contextvars
+import os
+import random
+import threading
+import time
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_BACKOFF_BASE_SECONDS = float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "1"))
+LLM_BACKOFF_MAX_SECONDS = float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "30"))
+# 0 disables hedging; otherwise a duplicate request is sent after this many seconds
+# and the first successful answer wins
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "0"))
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+# With hedging on, blocking callers wait on futures: primaries get their own, larger pool
+# so that duplicates never queue behind them (or the other way round)
+LLM_HEDGE_PRIMARY_WORKERS = int(os.getenv("LLM_HEDGE_PRIMARY_WORKERS", "64"))
+
+_primary_pool = ThreadPoolExecutor(max_workers=LLM_HEDGE_PRIMARY_WORKERS, thread_name_prefix="hedge-primary")
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="hedge")
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+# -----------------------------
+# Circuit breaker per deployment
+# -----------------------------
+class CircuitBreaker:
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise ``CircuitOpenError`` while open; return True if this call is the half-open probe."""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            # Half-open: a single call goes through as a probe, the rest keep failing fast
+            if self.probing or time.monotonic() - self.opened_at < self.reset_seconds:
+                raise CircuitOpenError(
+                    f"Azure OpenAI deployment '{self.name}' is unhealthy; "
+                    f"requests are paused for up to {self.reset_seconds:g}s"
+                )
+            self.probing = True
+            return True
+
+    def end_probe(self):
+        # Outcomes that are neither success nor failure (throttling, bad requests) free the slot too
+        with self._lock:
+            self.probing = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                if self.opened_at is None:
+                    CIRCUIT_TRIPS.labels(self.name).inc()
+                self.opened_at = time.monotonic()
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name):
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def _retryable_errors():
+    # Imported here so that loading this module does not pull in the openai SDK
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+    return (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+
+def _is_rate_limit(error):
+    from openai import RateLimitError
+    return isinstance(error, RateLimitError)
+
+
+# -----------------------------
+# Backoff
+# -----------------------------
+def _retry_after(error):
+    # Azure sends retry-after-ms / retry-after on 429 and some 5xx responses
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except ValueError:
+        pass
+    return None
+
+
+def _backoff(attempt, error):
+    retry_after = _retry_after(error)
+    if retry_after is not None:
+        return min(retry_after, LLM_BACKOFF_MAX_SECONDS)
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(LLM_BACKOFF_MAX_SECONDS, LLM_BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _hedged(fn, hedge_after, stage):
+    # Each request runs in its own copy of the caller's context (e.g. the pipeline mode used
+    # for metrics); a context cannot be entered by two threads at once
+    first = _primary_pool.submit(contextvars.copy_context().run, fn)
+    done, _ = wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+
+    LLM_HEDGES.labels(stage).inc()
+    pending = {first, _hedge_pool.submit(contextvars.copy_context().run, fn)}
+    error = None
+
+    # First successful answer wins; a blocked call cannot be interrupted, so the loser
+    # finishes in the background
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+
+    raise error
+
+
+# -----------------------------
+# Shared call layer for every Azure OpenAI stage
+# -----------------------------
+def resilient_call(stage, deployment, fn, hedge_after=LLM_HEDGE_AFTER_SECONDS):
+    breaker = get_breaker(deployment)
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        probe = breaker.before_call()
+        try:
+            if hedge_after and hedge_after > 0:
+                result = _hedged(fn, hedge_after, stage)
+            else:
+                result = fn()
+        except _retryable_errors() as e:
+            # Throttling is not a sign of an unhealthy deployment
+            if not _is_rate_limit(e):
+                breaker.record_failure()
+            if attempt == LLM_MAX_RETRIES:
+                raise
+
+            delay = _backoff(attempt, e)
+            LLM_RETRIES.labels(stage).inc()
+            print(f"{stage}: {type(e).__name__}, retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{LLM_MAX_RETRIES})")
+            time.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+        finally:
+            if probe:
+                breaker.end_probe()
+
+
+# -----------------------------
+# Same policy for the async client
+# -----------------------------
+async def _hedged_async(fn, hedge_after, stage):
+    first = asyncio.ensure_future(fn())
+    done, _ = await asyncio.wait([first], timeout=hedge_after)
+    if done:
+        return first.result()
+
+    LLM_HEDGES.labels(stage).inc()
+    pending = {first, asyncio.ensure_future(fn())}
+    error = None
+
+    # Unlike threads, the slower request can be cancelled once one answer wins
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                for other in pending:
+                    other.cancel()
+                return task.result()
+            error = task.exception()
+
+    raise error
+
+
+async def async_resilient_call(stage, deployment, fn, hedge_after=LLM_HEDGE_AFTER_SECONDS):
+    """``resilient_call`` for a coroutine function ``fn``; backoff sleeps do not block the loop."""
+    breaker = get_breaker(deployment)
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        probe = breaker.before_call()
+        try:
+            if hedge_after and hedge_after > 0:
+                result = await _hedged_async(fn, hedge_after, stage)
+            else:
+                result = await fn()
+        except _retryable_errors() as e:
+            if not _is_rate_limit(e):
+                breaker.record_failure()
+            if attempt == LLM_MAX_RETRIES:
+                raise
+
+            delay = _backoff(attempt, e)
+            LLM_RETRIES.labels(stage).inc()
+            print(f"{stage}: {type(e).__name__}, retrying in {delay:.1f}s "
+                  f"(attempt {attempt + 1}/{LLM_MAX_RETRIES})")
+            await asyncio.sleep(delay)
+        else:
+            breaker.record_success()
+            return result
+        finally:
+            if probe:
+                breaker.end_probe()
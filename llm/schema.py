@@ -0,0 +1,135 @@
+from llm.streaming import SectionParser
+import re
+
+
+def _object(properties):
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def _array_of(properties):
+    return {"type": "array", "items": _object(properties)}
+
+
+STRING = {"type": "string"}
+NUMBER = {"type": "number"}
+
+# -------------------------------------------------------------------
+# JSON SCHEMA FOR THE COST ESTIMATE
+# One entry per top-level section the model emits; monthly figures are
+# derived locally by llm.cost_engine.
+# -------------------------------------------------------------------
+SECTION_SCHEMAS = {
+    "baseline_summary": _array_of({
+        "parameter": STRING,
+        "usecase_details": STRING,
+        "source_of_assumption": STRING,
+        "notes": STRING,
+    }),
+    "detailed_cost_components": _array_of({
+        "component": STRING,
+        "calculation_logic": STRING,
+        "quantity": NUMBER,
+        "unit": STRING,
+        "unit_cost_usd": NUMBER,
+        "source": STRING,
+        "remarks": STRING,
+    }),
+    "pipeline_groups": _array_of({
+        "pipeline_name": STRING,
+        "data_sources_included": STRING,
+        "refresh_frequency": STRING,
+        "runs_per_month": NUMBER,
+        "avg_hours_per_run": NUMBER,
+    }),
+    "cost_inputs": _object({
+        "dbus_per_hour": NUMBER,
+        "dbu_rate_usd": NUMBER,
+        "environment_factors": _object({"Dev": NUMBER, "QA": NUMBER, "Prod": NUMBER}),
+        "monthly_growth_rate": NUMBER,
+    }),
+}
+
+COST_JSON_SCHEMA = _object(SECTION_SCHEMAS)
+
+
+def section_schema(name):
+    # Wraps one section so it can be requested on its own
+    return _object({name: SECTION_SCHEMAS[name]})
+
+
+def response_format(name, schema):
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "schema": schema, "strict": True},
+    }
+
+
+def text_format(name, schema):
+    # The Responses API spelling of ``response_format``
+    return {"type": "json_schema", "name": name, "schema": schema, "strict": True}
+
+
+# -----------------------------
+# Lenient validation used for repair
+# -----------------------------
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    try:
+        float(str(value).strip().replace(",", "").replace("$", ""))
+        return True
+    except ValueError:
+        return False
+
+
+def _matches(value, schema):
+    kind = schema["type"]
+    if kind == "string":
+        return value is not None and not isinstance(value, (dict, list))
+    if kind == "number":
+        return _is_number(value)
+    if kind == "object":
+        return isinstance(value, dict) and all(
+            key in value and _matches(value[key], sub)
+            for key, sub in schema["properties"].items()
+        )
+    if kind == "array":
+        return isinstance(value, list) and all(_matches(item, schema["items"]) for item in value)
+    return False
+
+
+def repair_sections(text):
+    """Split model output into usable sections and the ones that must be re-requested.
+
+    Complete sections are recovered even when the document is truncated. Array
+    items that do not match the schema are dropped; a section is only given up
+    on when it is missing, of the wrong shape, or every one of its items is
+    invalid. An empty array is a legitimate answer and is kept.
+    """
+    parser = SectionParser()
+    parser.feed(re.sub(r"```json|```", "", text or ""))
+
+    sections = {}
+    missing = []
+    for name, schema in SECTION_SCHEMAS.items():
+        value = parser.sections.get(name)
+
+        if schema["type"] == "array" and isinstance(value, list):
+            valid = [item for item in value if _matches(item, schema["items"])]
+            if valid or not value:
+                sections[name] = valid
+                continue
+        elif _matches(value, schema):
+            sections[name] = value
+            continue
+
+        missing.append(name)
+
+    return sections, missing
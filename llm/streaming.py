@@ -0,0 +1,94 @@
+import json
+import queue
+import threading
+import traceback
+
+_decoder = json.JSONDecoder()
+
+# Emit a progress event (streamed chunk count) every this many chunks
+TOKEN_EVENT_EVERY = 25
+
+
+# -----------------------------
+# Incremental parsing of the cost JSON's top-level sections
+# -----------------------------
+class SectionParser:
+    """Pick complete top-level sections out of a cost JSON that is still streaming.
+
+    ``feed`` returns the ``(name, value)`` pairs completed by the new text.
+    Sections are only re-scanned when the delta could close a value.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.sections = {}
+        self._cursor = None
+
+    def feed(self, delta):
+        self.text += delta
+        if self._cursor is None:
+            start = self.text.find("{")
+            if start == -1:
+                return []
+            self._cursor = start + 1
+        elif not any(c in delta for c in "]}\""):
+            return []
+
+        completed = []
+        while True:
+            pos = self._skip(self._cursor)
+            try:
+                name, pos = _decoder.raw_decode(self.text, pos)
+                pos = self._skip(pos)
+                if self.text[pos:pos + 1] != ":":
+                    break
+                value, pos = _decoder.raw_decode(self.text, self._skip(pos + 1))
+            except (ValueError, IndexError):
+                break
+
+            # raw_decode accepts a number that may still be growing
+            if pos >= len(self.text) and isinstance(value, (int, float)):
+                break
+
+            self.sections[name] = value
+            completed.append((name, value))
+            self._cursor = pos
+
+        return completed
+
+    def _skip(self, pos):
+        while pos < len(self.text) and self.text[pos] in " \t\r\n,":
+            pos += 1
+        return pos
+
+
+# -----------------------------
+# Server-sent events for one pipeline run
+# -----------------------------
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_pipeline_events(pipeline, **kwargs):
+    """Run ``pipeline(**kwargs, events=...)`` on a thread and yield its events as SSE."""
+    events = queue.Queue()
+    done = object()
+
+    def run():
+        try:
+            result = pipeline(**kwargs, events=events.put)
+            events.put({"event": "result", **result})
+        except Exception as e:
+            traceback.print_exc()
+            events.put({"event": "error", "error": str(e)})
+        finally:
+            events.put(done)
+
+    threading.Thread(target=run, name="pipeline-stream", daemon=True).start()
+
+    while True:
+        event = events.get()
+        if event is done:
+            return
+        event = dict(event)
+        yield _sse(event.pop("event"), event)
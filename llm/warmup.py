@@ -0,0 +1,57 @@
+from concurrent.futures import ThreadPoolExecutor
+import importlib
+import time
+
+
+def _import(module):
+    return lambda: importlib.import_module(module)
+
+
+def _blob_service():
+    from llm.adls import get_blob_service
+    get_blob_service()
+
+
+def _drive_credentials():
+    from llm.gdrive import get_drive_credentials
+    get_drive_credentials()
+
+
+WARMUP_TASKS = {
+    # Clients are per event loop (see llm.llm.get_async_client); the SDK import is the slow part
+    "openai_sdk": _import("openai"),
+    "excel_writer": _import("excel.excel_writer_combined"),
+    "cost_engine": _import("llm.cost_engine"),
+    "scenarios": _import("excel.scenarios"),
+    "pillow": _import("PIL.Image"),
+    "blob_service": _blob_service,
+    "drive_credentials": _drive_credentials,
+}
+
+
+# -----------------------------
+# Build heavy SDKs and clients in parallel, off the request path
+# -----------------------------
+def warm_up(tasks=WARMUP_TASKS):
+    started = time.perf_counter()
+
+    def run(name, task):
+        t = time.perf_counter()
+        try:
+            task()
+        except Exception as e:
+            # Missing credentials etc. surface on first real use instead
+            return name, None, str(e)
+        return name, time.perf_counter() - t, None
+
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="warmup") as pool:
+        results = list(pool.map(lambda item: run(*item), tasks.items()))
+
+    for name, seconds, error in results:
+        if error:
+            print(f"Warm-up {name} skipped: {error}")
+        else:
+            print(f"Warm-up {name}: {seconds:.2f}s")
+    print(f"Warm-up finished in {time.perf_counter() - started:.2f}s")
+
+    return results
@@ -1,26 +1,194 @@
-from fastapi import FastAPI
-from pydantic import BaseModel, HttpUrl
-from typing import List
-from llm.llm import run_llm_pipeline
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field, HttpUrl, model_validator
+from prometheus_client import make_asgi_app
+from typing import Dict, List, Literal, Optional
+from llm.llm import run_llm_pipeline, run_llm_pipeline_async, regenerate_workbook
+from llm.estimates import load_estimate
+from llm.warmup import warm_up
+from llm.jobs import submit_job, get_job, resume_jobs, shutdown_jobs
+from llm.cache import cache_stats
+from llm.batch import run_batch, BATCH_CONCURRENCY
+from llm.streaming import stream_pipeline_events
+import json
+import os
+import threading
 
-app = FastAPI()
+
+# Build SDK clients in the background at startup instead of on the first request
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
+
+    resumed = resume_jobs()
+    if resumed:
+        print(f"Resumed {resumed} unfinished job(s)")
+    yield
+    shutdown_jobs()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Prometheus exposition of per-stage latency histograms, token and cost counters
+app.mount("/metrics", make_asgi_app())
 
 class MarketInput(BaseModel):
     market: str
     multiplier: float
     start_month: int
-    
+
 class GenerateRequest(BaseModel):
-    image_uri: str
+    image_uri: Optional[str] = None
+    # Several diagrams (ingestion, ML, reporting...) analysed together with image_uri
+    image_uris: List[str] = Field(default_factory=list)
+    # Local path or http(s) URL of a PDF solution document
+    document_uri: Optional[str] = None
+    # Free-text requirements, volumes or budget the estimate should account for
+    requirements: Optional[str] = None
+    client_name: str
+    use_case_name: str
+    markets: List[MarketInput]
+    refresh: bool = False
+    mode: Optional[Literal["three_call", "two_call", "fused"]] = None
+
+    @model_validator(mode="after")
+    def require_input(self):
+        if not (self.image_uri or self.image_uris or self.document_uri or self.requirements):
+            raise ValueError("image_uri, image_uris, document_uri or requirements is required")
+        return self
+
+    def images(self):
+        images = ([self.image_uri] if self.image_uri else []) + self.image_uris
+        # A single diagram keeps the plain string form
+        return images if len(images) > 1 else (images[0] if images else None)
+
+    def pipeline_args(self):
+        return {
+            "image_uri": self.images(),
+            "client_name": self.client_name,
+            "use_case_name": self.use_case_name,
+            "markets": [m.model_dump() for m in self.markets],
+            "refresh": self.refresh,
+            "mode": self.mode,
+            "document_uri": self.document_uri,
+            "requirements": self.requirements,
+        }
+
+class BatchGenerateRequest(BaseModel):
+    items: List[GenerateRequest]
+    concurrency: int = Field(default=BATCH_CONCURRENCY, ge=1, le=64)
+
+class RegenerateRequest(BaseModel):
     client_name: str
     use_case_name: str
     markets: List[MarketInput]
-    
+
+class ScenarioRequest(BaseModel):
+    client_name: Optional[str] = None
+    use_case_name: Optional[str] = None
+    monthly_environment_costs: Optional[Dict[str, dict]] = None
+    plans: List[List[MarketInput]]
+    top_n: Optional[int] = Field(default=50, ge=1)
+    descending: bool = False
+    include_workbook: bool = False
+
 @app.post("/generate")
-def generate_cost(req: GenerateRequest):
-    result = run_llm_pipeline(req.image_uri,  req.client_name, req.use_case_name, 
-            [m.model_dump() for m in req.markets])
+async def generate_cost(req: GenerateRequest):
+    # Runs on the event loop, so waiting on the model does not hold a threadpool thread
+    result = await run_llm_pipeline_async(**req.pipeline_args())
     return {
         "status": "success",
         **result
     }
+
+@app.post("/generate/stream")
+def generate_cost_stream(req: GenerateRequest):
+    # Server-sent events: stage, tokens and section as they happen (retry when the cost JSON
+    # stream starts over), then result or error
+    return StreamingResponse(
+        stream_pipeline_events(run_llm_pipeline, **req.pipeline_args()),
+        media_type="text/event-stream"
+    )
+
+@app.post("/generate/batch")
+def generate_cost_batch(req: BatchGenerateRequest):
+    # One JSON object per line: each item as it finishes, then the summary
+    lines = (
+        json.dumps(item) + "\n"
+        for item in run_batch([r.pipeline_args() for r in req.items], req.concurrency)
+    )
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+@app.post("/regenerate")
+def regenerate_cost(req: RegenerateRequest):
+    try:
+        result = regenerate_workbook(req.client_name, req.use_case_name,
+                [m.model_dump() for m in req.markets])
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {
+        "status": "success",
+        **result
+    }
+
+@app.post("/scenarios")
+def sweep_scenarios(req: ScenarioRequest):
+    from excel.scenarios import rank_market_plans
+
+    monthly_env = req.monthly_environment_costs
+    if monthly_env is not None and req.include_workbook:
+        # The workbook is built from the stored estimate, so the ranking must be too
+        raise HTTPException(
+            status_code=422,
+            detail="monthly_environment_costs cannot be combined with include_workbook; "
+                   "the workbook uses the stored estimate for client_name and use_case_name"
+        )
+    if monthly_env is None:
+        if not (req.client_name and req.use_case_name):
+            raise HTTPException(
+                status_code=422,
+                detail="client_name and use_case_name are required without monthly_environment_costs"
+            )
+        estimate = load_estimate(req.client_name, req.use_case_name)
+        if estimate is None:
+            raise HTTPException(status_code=404, detail="No stored estimate for this client and use case")
+        monthly_env = estimate["cost_json"].get("monthly_environment_costs", {})
+
+    plans = [[m.model_dump() for m in plan] for plan in req.plans]
+    ranked = rank_market_plans(monthly_env, plans, req.top_n, req.descending)
+    response = {
+        "status": "success",
+        "plans_evaluated": len(plans),
+        "scenarios": ranked
+    }
+
+    # Workbook with the best plan on Yearly_Cost and the ranking on Market_Scenarios
+    if req.include_workbook and ranked:
+        response.update(regenerate_workbook(
+            req.client_name, req.use_case_name, ranked[0]["markets"], scenarios=ranked
+        ))
+    return response
+
+@app.post("/jobs", status_code=202)
+def create_job(req: GenerateRequest):
+    job_id = submit_job(req.pipeline_args())
+    return {
+        "job_id": job_id,
+        "status": "queued"
+    }
+
+@app.get("/jobs/{job_id}")
+def read_job(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/cache/stats")
+def read_cache_stats():
+    return cache_stats()
@@ -1,8 +1,9 @@
 import os
 import base64
+import hashlib
 import streamlit as st
-from PyPDF2 import PdfReader
-from test import tester
+from llm.llm import run_llm_pipeline
+from llm.pdf import extract_pdf_text
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -47,6 +48,14 @@ if "final_prompt" not in st.session_state:
 if "gdrive_link" not in st.session_state:
     st.session_state.gdrive_link = None
 
+# Extracted PDF text by file hash, so reruns do not parse the same document again
+if "pdf_texts" not in st.session_state:
+    st.session_state.pdf_texts = {}
+
+# Cloudinary URLs by file hash, so each image is uploaded once per session
+if "image_urls" not in st.session_state:
+    st.session_state.image_urls = {}
+
 
 # ======================================================
 # LOAD CSS
@@ -120,7 +129,6 @@ with st.sidebar:
         step=10000
     )
 
-
     # =========================
     # MARKET CONFIG
     # =========================
@@ -291,6 +299,11 @@ async def upload_image_to_cloudinary_async(file):
     return result["secure_url"]
 
 
+async def upload_images_to_cloudinary_async(files):
+    # All new images go up concurrently on one event loop
+    return await asyncio.gather(*(upload_image_to_cloudinary_async(f) for f in files))
+
+
 # # Example usage
 # url, public_id = upload_image_and_get_url("sample.jpg")
 # print("Image URL:", url)
@@ -306,23 +319,42 @@ uploaded_files = st.file_uploader(
 )
 
 extracted_text = ""
-image_url = None
+image_urls = []
 if uploaded_files:
+    images = []
     for file in uploaded_files:
         if file.name.lower().endswith("pdf"):
-            reader = PdfReader(file)
-            for page in reader.pages:
-                extracted_text += (page.extract_text() or "") + "\n"
+            data = file.getvalue()
+            digest = hashlib.sha256(data).hexdigest()
+            if digest not in st.session_state.pdf_texts:
+                with st.spinner(f"Extracting text from {file.name}..."):
+                    st.session_state.pdf_texts[digest] = extract_pdf_text(data)
+            extracted_text += st.session_state.pdf_texts[digest] + "\n"
         else:
             # extracted_text += f"[IMAGE: {file.name}]\n"
-            image_url = asyncio.run(
-                upload_image_to_cloudinary_async(file)
+            images.append((hashlib.sha256(file.getvalue()).hexdigest(), file))
+
+    pending = {
+        digest: file for digest, file in images
+        if digest not in st.session_state.image_urls
+    }
+    if pending:
+        with st.spinner(f"Uploading {len(pending)} image(s)..."):
+            urls = asyncio.run(
+                upload_images_to_cloudinary_async(list(pending.values()))
             )
+        st.session_state.image_urls.update(zip(pending, urls))
 
-            st.image(image_url, width=200)
-            st.success("Image uploaded successfully!")
+    for digest, file in images:
+        image_url = st.session_state.image_urls[digest]
+        if image_url not in image_urls:
+            image_urls.append(image_url)
+        st.image(image_url, width=200)
 
-st.write("Image URL:", image_url)
+    if pending:
+        st.success("Image uploaded successfully!")
+
+st.write("Image URLs:", image_urls)
 # ======================================================
 # AI ANALYSIS
 # ======================================================
@@ -345,32 +377,42 @@ REPORTING:
 """.strip()
 
 
+# Sent to the model next to the uploaded documents
 prompt_input = st.text_area(
     "User Prompt",
-    value=st.session_state.final_prompt or
-    "Extract cloud resources and estimate consumption. Output JSON only.",
+    value=st.session_state.final_prompt,
+    placeholder="Requirements, volumes and constraints the estimate should account for.",
     height=260
 )
 
 st.markdown("---")
 col1, col2 = st.columns([3, 1])
 
-from test import tester
-
 with col1:
     if st.button("Generate Cost Estimate with AI", type="primary", use_container_width=True):
+        # The prompt and the budget go to the model as requirements, apart from the documents
+        requirements = "\n".join(
+            part for part in (
+                prompt_input.strip(),
+                f"Annual cloud budget: ${annual_budget:,} USD" if annual_budget else ""
+            ) if part
+        )
         with st.spinner("Analyzing and estimating..."):
-            ai_response = tester(
-                image_url,
-                client_name,
-                use_case_name,
-                markets,
-                prompt_input,
-                annual_budget
-            )
-
-            print(ai_response)
-            st.session_state.gdrive_link = ai_response.get("gdrive_link")
+            try:
+                ai_response = run_llm_pipeline(
+                    image_urls or None,
+                    client_name,
+                    use_case_name,
+                    markets,
+                    document_text=extracted_text.strip() or None,
+                    requirements=requirements or None
+                )
+            except ValueError as e:
+                # e.g. nothing was uploaded and no prompt was given
+                st.error(str(e))
+            else:
+                print(ai_response)
+                st.session_state.gdrive_link = ai_response.get("drive_link")
 
 with col2:
     if st.button("Test LLM", use_container_width=True):